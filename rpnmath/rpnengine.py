@@ -1,7 +1,7 @@
 # Math Engine for Tinkasm 
 # Scot W. Stevenson <scot.stevenson@gmail.com>
 # First version: 13. Jan 2019
-# This version: 13. Jan 2019
+# This version: 18. Oct 2026
 """Provide a stack-based RPN math engine for the Tinkasm"""
 
 from collections import deque
@@ -9,17 +9,30 @@ from random import randint
 
 from common.common import convert_number
 
+# NumPy is optional. Without it, batch_engine() works one term after the other
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Smallest number of terms of the same form that we hand to NumPy. For fewer,
+# setting up the arrays takes longer than just doing the math
+BATCH_MIN = 32
+
+# Directives that must be run separately for every term
+NO_BATCH = ['.rand']
+
 # ---- DIRECTIVES ----
 
 def op_and(d):
-    """Logically AND NOS and TOS"""
+    """Bitwise AND NOS and TOS"""
     try:
         tos = d.pop()
         nos = d.pop()
     except IndexError:
         print('MATH ERROR: .and: Stack underflow')
     else:
-        res = nos and tos
+        res = nos & tos
         d.append(res)
 
 
@@ -30,21 +43,23 @@ def op_bank(d):
     except IndexError:
         print('MATH ERROR: .bank: Stack underflow')
     else:
-        res = (tos and 0xFF0000) >> 16
+        res = (tos & 0xFF0000) >> 16
         d.append(res)
 
 
 def op_div(d):
-    """Multiply TOS and NOS"""
+    """Divide NOS by TOS. This is integer division, rounding down, so the
+    result can be used by the bitwise directives
+    """
     try:
         tos = d.pop()
         nos = d.pop()
     except IndexError:
-        print('MATH ERROR: *: Stack underflow')
+        print('MATH ERROR: /: Stack underflow')
     else:
 
         try:
-            res = nos / tos
+            res = nos // tos
         except ZeroDivisionError:
             print('MATH ERROR: Division by Zero')
         else:
@@ -88,7 +103,7 @@ def op_lsb(d):
     except IndexError:
         print('MATH ERROR: .lsb: Stack underflow')
     else:
-        res = tos and 0xFF
+        res = tos & 0xFF
         d.append(res)
 
 
@@ -111,7 +126,7 @@ def op_msb(d):
     except IndexError:
         print('MATH ERROR: .msb: Stack underflow')
     else:
-        res = (tos and 0xFF00) >> 8
+        res = (tos & 0xFF00) >> 8
         d.append(res)
 
 
@@ -140,14 +155,14 @@ def op_mult(d):
  
 
 def op_or(d):
-    """Logically OR NOS and TOS"""
+    """Bitwise OR NOS and TOS"""
     try:
         tos = d.pop()
         nos = d.pop()
     except IndexError:
         print('MATH ERROR: .or: Stack underflow')
     else:
-        res = nos or tos
+        res = nos | tos
         d.append(res)
 
 
@@ -232,7 +247,120 @@ dir_table = {
         ".rshift": op_rshift,
         ".swap": op_swap,
         ".xor": op_xor}
-    
+
+# How many numbers each word takes from the stack and how many it leaves there.
+# Words defined with define_word() are added here as well
+stack_effects = {
+        "+": (2, 1),
+        "-": (2, 1),
+        "*": (2, 1),
+        "/": (2, 1),
+        ".and": (2, 1),
+        ".bank": (1, 1),
+        ".drop": (1, 0),
+        ".dup": (1, 2),
+        ".inv": (1, 1),
+        ".lshift": (2, 1),
+        ".lsb": (1, 1),
+        ".msb": (1, 1),
+        ".or": (2, 1),
+        ".over": (2, 3),
+        ".rand": (0, 1),
+        ".rshift": (2, 1),
+        ".swap": (2, 2),
+        ".xor": (2, 1)}
+
+
+# ---- USER DEFINITIONS ----
+
+def stack_effect(ws):
+    """Given a list of words, return a tuple of how many numbers they take
+    from the stack and how many they leave there. Numbers count as words
+    that leave one number. Return None if there is a word we don't know.
+    """
+    depth = 0
+    needed = 0
+
+    for w in ws:
+
+        try:
+            takes, leaves = stack_effects[w]
+        except KeyError:
+            f_conv, _ = convert_number(w)
+
+            if not f_conv:
+                return None
+
+            takes, leaves = 0, 1
+
+        depth -= takes
+        needed = max(needed, -depth)
+        depth += leaves
+
+    return needed, depth + needed
+
+
+def compile_word(ops):
+    """Given a list of routines that work on the stack, return a routine that
+    runs them all
+    """
+    def word(d):
+        for op in ops:
+            op(d)
+
+    return word
+
+
+def define_word(name, s, effect=None):
+    """Given the name of a new word, a string of space-delimited numbers,
+    operations and/or directives as for engine() and an optional tuple of
+    how many numbers the word takes from the stack and how many it leaves,
+    compile the word and add it to the directives. Names must start with
+    a dot. Return a flag showing success or failure.
+    """
+    ws = s.split()
+
+    if name[0] != '.' or convert_number(name)[0]:
+        print(f'MATH ERROR: Name of new word "{name}" must start with a dot')
+        return False
+
+    if name in dir_table:
+        print(f'MATH ERROR: Word "{name}" already defined')
+        return False
+
+    # Check the stack effect before we compile anything
+    found = stack_effect(ws)
+
+    if found is None:
+        unknown = [w for w in ws if stack_effect([w]) is None]
+        print(f'MATH ERROR: "{unknown[0]}" in "{name}" is neither directive nor number')
+        return False
+
+    if effect is not None and found != tuple(effect):
+        print(f'MATH ERROR: "{name}" takes {found[0]} and leaves {found[1]}, '\
+                f'not {effect[0]} and {effect[1]}')
+        return False
+
+    # Numbers are compiled to routines that push them
+    ops = []
+
+    for w in ws:
+
+        if w in dir_table:
+            ops.append(dir_table[w])
+        else:
+            ops.append(lambda d, n=convert_number(w)[1]: d.append(n))
+
+    dir_table[name] = compile_word(ops)
+    stack_effects[name] = found
+
+    # Words that must run separately for every term pass this on to the words
+    # that use them
+    if set(ws) & set(NO_BATCH):
+        NO_BATCH.append(name)
+
+    return True
+
 
 # ---- MAIN ROUTINE ----
 
@@ -266,6 +394,116 @@ def engine(s):
     return stack[0], ok
 
 
+def run_form(form, operands):
+    """Given the form of a term as a tuple of directives and None for each
+    operand, and the list of operands, run the term and return the stack.
+    The operands can be numbers or NumPy arrays of numbers, because the
+    directives only use operators that work for both.
+    """
+    stack = deque()
+    ops = iter(operands)
+
+    for w in form:
+
+        if w is None:
+            stack.append(next(ops))
+        else:
+            dir_table[w](stack)
+
+    return stack
+
+
+def batch_engine(terms, env=None):
+    """Take a list of strings like those for engine() and a dictionary of
+    symbols and their values, and calculate all terms. Terms can contain
+    symbols from the dictionary. Return a list of integers and a flag showing
+    success or failure. Terms that have the same form - the same directives
+    in the same order - are calculated together with NumPy if it is installed,
+    so '0 2 * 4000 +', '1 2 * 4000 +' and so on are one calculation with
+    arrays. Note NumPy uses 64-bit integers.
+    """
+    env = env or {}
+    results = [0]*len(terms)
+    ok = True
+
+    # Sort the terms by their form, keeping the index and operands of each.
+    # Tables use the same words over and over, so we remember what they are
+    forms = {}
+    words = {}
+
+    for i, t in enumerate(terms):
+        form = []
+        operands = []
+
+        for w in t.split():
+
+            if w in dir_table:
+                form.append(w)
+                continue
+
+            try:
+                n = words[w]
+            except KeyError:
+
+                if w.isdecimal():
+                    n = int(w)
+                else:
+                    f_conv, n = convert_number(w)
+
+                    if not f_conv:
+                        n = env.get(w.lower())
+
+                words[w] = n
+
+            if n is None:
+                print(f'MATH ERROR: "{w}" is neither directive, number nor symbol')
+                ok = False
+                n = 0
+
+            form.append(None)
+            operands.append(n)
+
+        forms.setdefault(tuple(form), []).append((i, operands))
+
+    for form, members in forms.items():
+
+        # With enough terms of this form, we do them all at once as arrays
+        # of the operands. NumPy doesn't raise ZeroDivisionError, so if it
+        # complains about anything, or can't use a directive with arrays, we
+        # do the terms separately instead
+        if np is not None and len(members) >= BATCH_MIN and\
+                None in form and not set(form) & set(NO_BATCH):
+            columns = [np.array(c, dtype=np.int64)\
+                    for c in zip(*[m[1] for m in members])]
+
+            try:
+                with np.errstate(all='raise'):
+                    stack = run_form(form, columns)
+            except (FloatingPointError, TypeError):
+                pass
+            else:
+
+                if len(stack) == 1:
+                    values = np.broadcast_to(stack[0], len(members))
+
+                    for (i, _), v in zip(members, values.astype(np.int64).tolist()):
+                        results[i] = v
+
+                    continue
+
+        for i, operands in members:
+            stack = run_form(form, operands)
+
+            if len(stack) != 1:
+                print(f'MATH ERROR: Stack ends with length {len(stack)}, not 1, inserting 0')
+                ok = False
+                continue
+
+            results[i] = int(stack[0])
+
+    return results, ok
+
+
 if __name__ == '__main__':
     test_string = f'.rand'
     print(engine(test_string))
@@ -1,13 +1,15 @@
 # Tests for the Math Engine of Tinkasm 
 # Scot W. Stevenson <scot.stevenson@gmail.com>
 # First version: 13. Jan 2019
-# This version: 07. Feb 2019
+# This version: 18. Oct 2026
 
-# From this directory, run "python3 -m unittest"
+# From this directory, run "PYTHONPATH=.. python3 -m unittest"
 
+import contextlib
 import unittest
 
-from rpnengine import engine
+import rpnengine
+from rpnengine import engine, batch_engine, define_word, stack_effect
 
 class TestHelpers(unittest.TestCase):
 
@@ -18,7 +20,7 @@ class TestHelpers(unittest.TestCase):
         self.assertEqual(engine('6 2 /'), (3, True))
 
     def test_masking(self):
-        self.assertEqual(engine('10255 .lsb'), (255, True))
+        self.assertEqual(engine('10255 .lsb'), (15, True))
         self.assertEqual(engine(f'{str(0xFF0A)} .msb'), (255, True))
         self.assertEqual(engine(f'{str(0xFFEEDD)} .bank'), (255, True))
 
@@ -26,6 +28,8 @@ class TestHelpers(unittest.TestCase):
         self.assertEqual(engine('3 1 .and'), (1, True))
         self.assertEqual(engine('3 1 .or'), (3, True))
         self.assertEqual(engine('3 1 .xor'), (2, True))
+        self.assertEqual(engine('6 3 .and'), (2, True))
+        self.assertEqual(engine('4 1 .or'), (5, True))
 
     def test_bit_twiddle(self):
         self.assertEqual(engine('2 1 .lshift'), (4, True))
@@ -46,6 +50,99 @@ class TestHelpers(unittest.TestCase):
         self.assertEqual(engine('2 2'), (2, False))
 
 
+class NoArrays:
+    """Stand-in for NumPy with arrays that no directive can work with, so
+    batch_engine() has to do the terms one by one
+    """
+    int64 = int
+
+    def array(self, c, dtype=None):
+        return object()
+
+    def errstate(self, **kwargs):
+        return contextlib.suppress()
+
+
+class TestBatch(unittest.TestCase):
+
+    def check_batch(self):
+        terms = [f'base {i} 2 * +' for i in range(100)] + ['6 2 /', '1 0 /']
+        r, ok = batch_engine(terms, {'base': 4096})
+        self.assertEqual(r[:100], [4096 + 2*i for i in range(100)])
+        self.assertEqual(r[100], 3)
+        self.assertFalse(ok)
+
+    def test_batch(self):
+        self.check_batch()
+
+    def test_batch_without_numpy(self):
+        saved = rpnengine.np
+        rpnengine.np = None
+
+        try:
+            self.check_batch()
+        finally:
+            rpnengine.np = saved
+
+    def test_batch_fallback(self):
+        saved = rpnengine.np
+        rpnengine.np = NoArrays()
+
+        try:
+            self.check_batch()
+        finally:
+            rpnengine.np = saved
+
+    def test_batch_division(self):
+        # Division gives integers, so the bitwise directives work after it
+        terms = [f'{i} 2 / 1 .and' for i in range(40)]
+        self.assertEqual(batch_engine(terms), ([(i//2) & 1 for i in range(40)], True))
+        self.assertEqual(engine('7 2 /'), (3, True))
+
+    def test_batch_same_as_engine(self):
+        terms = ['43707 .dup .lsb 8 .lshift .swap .msb 8 .rshift .or',\
+                '2 12 .over / +', '2 .inv', '1 2 .drop']
+
+        for t in terms:
+            self.assertEqual(batch_engine([t]*40), ([engine(t)[0]]*40, True))
+
+    def test_batch_errors(self):
+        self.assertEqual(batch_engine(['frog 1 +']), ([1], False))
+        self.assertEqual(batch_engine(['2 2']), ([0], False))
+
+
+class TestDefinitions(unittest.TestCase):
+
+    def define(self, name, s, effect=None):
+        """Define a word and remove it again after the test"""
+        ok = define_word(name, s, effect)
+
+        if ok:
+            self.addCleanup(rpnengine.dir_table.pop, name)
+            self.addCleanup(rpnengine.stack_effects.pop, name)
+
+        return ok
+
+    def test_stack_effect(self):
+        self.assertEqual(stack_effect('.dup *'.split()), (1, 1))
+        self.assertEqual(stack_effect('1 2 +'.split()), (0, 1))
+        self.assertEqual(stack_effect('.swap .drop'.split()), (2, 1))
+        self.assertEqual(stack_effect('frog'.split()), None)
+
+    def test_define(self):
+        self.assertTrue(self.define('.sq', '.dup *', (1, 1)))
+        self.assertEqual(engine('3 .sq'), (9, True))
+        self.assertTrue(self.define('.sqplus', '.sq 1 +'))
+        self.assertEqual(engine('3 .sqplus'), (10, True))
+        self.assertEqual(batch_engine(['3 .sq']*40), ([9]*40, True))
+
+    def test_define_errors(self):
+        self.assertFalse(self.define('sq', '.dup *'))
+        self.assertFalse(self.define('.dup', '.dup'))
+        self.assertFalse(self.define('.sq', '.dup *', (2, 1)))
+        self.assertFalse(self.define('.sq', 'frog *'))
+
+
 if __name__ == '__main__':
     unittest.main()
 
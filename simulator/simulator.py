@@ -0,0 +1,1039 @@
+# Instruction Set Simulator for Tinkasm
+# Scot W. Stevenson <scot.stevenson@gmail.com>
+# First version: 18. Oct 2026
+# This version: 18. Oct 2026
+"""Provide a simulator for the 6502, 65c02 and 65816 to count the cycles
+code assembled by Tinkasm takes"""
+
+# Run this with the opcode table of the MPU:
+#
+#       from opcodes65816 import opcode_table
+#       sim = Simulator(opcode_table, '65816')
+#       sim.load(objectcode, 0xe000)
+#       cycles, instructions, reason = sim.run(0xe010)
+#
+# The simulator is driven by the same opcode tables as the assembler: The
+# mnemonic of each entry tells us the operation and the addressing mode, the
+# rest of the entry the length and the cycles with their extra rules. From
+# these, we build a dispatch table of one function for each opcode before we
+# start, so during the run, there is no decoding at all.
+
+# ---- CONSTANTS ----
+
+# Bits of the status register
+C_FLAG = 0x01
+Z_FLAG = 0x02
+I_FLAG = 0x04
+D_FLAG = 0x08
+X_FLAG = 0x10   # Break flag in emulated mode and for the 6502/65c02
+M_FLAG = 0x20   # Always set in emulated mode and for the 6502/65c02
+V_FLAG = 0x40
+N_FLAG = 0x80
+
+# We stop after this many instructions in case the code never returns
+MAX_INSTRUCTIONS = 10_000_000
+
+# The 6502 and 65c02 use different names for the direct page modes
+ZERO_PAGE_MODES = {'z': 'd', 'zx': 'dx', 'zy': 'dy', 'zi': 'di', 'zxi': 'dxi',\
+        'ziy': 'diy'}
+
+# Instructions where the mnemonic doesn't tell us everything. The operation and
+# the addressing mode we use instead
+SPECIAL_INS = {
+        'bra.l': ('brl', 'r16'),
+        'jsr.l': ('jsl', 'jl'),
+        'jmp.l': ('jml', 'jl'),
+        'rts.l': ('rtl', ''),
+        'phe.#': ('pea', '#16'),
+        'phe.d': ('pei', 'd'),
+        'phe.r': ('per', 'r16'),
+        'jmp': ('jmp', 'j'),
+        'jmp.i': ('jmp', 'ji'),
+        'jmp.xi': ('jmp', 'jxi'),
+        'jmp.il': ('jml', 'jil'),
+        'jsr': ('jsr', 'j'),
+        'jsr.xi': ('jsr', 'jxi'),
+        'rep.#': ('rep', '#8'),
+        'sep.#': ('sep', '#8'),
+        'brk': ('brk', '#8'),
+        'cop': ('cop', '#8'),
+        'wdm': ('wdm', '#8'),
+        'mvn': ('mvn', 'mv'),
+        'mvp': ('mvp', 'mv')}
+
+BRANCHES = ['bcc', 'bcs', 'bne', 'beq', 'bpl', 'bmi', 'bvc', 'bvs', 'bra']
+
+# Immediate instructions that use the size of XY instead of A
+XY_IMM = ['cpx', 'cpy', 'ldx', 'ldy']
+
+# Negative and Zero flags for every 8 and 16 bit value, so we don't have to
+# compute them every time
+NZ8 = bytes((v & N_FLAG) | ((v == 0) << 1) for v in range(0x100))
+NZ16 = bytes(((v >> 8) & N_FLAG) | ((v == 0) << 1) for v in range(0x10000))
+
+
+# ---- SIMULATOR ----
+
+class Simulator:
+    """Simulate one MPU with its memory. Create with the opcode table of
+    the MPU and its name ('6502', '65c02' or '65816').
+    """
+
+    def __init__(self, opcode_table, mpu='6502'):
+        self.mpu = mpu.lower()
+        self.is_65816 = self.mpu == '65816'
+
+        if self.is_65816:
+            self.amask = 0xffffff
+        else:
+            self.amask = 0xffff
+
+        self.mem = bytearray(self.amask+1)
+        self.reset()
+        self.dispatch = [self._make_handler(e) for e in opcode_table]
+
+    def reset(self):
+        """Set registers to what they are after a reset of the MPU, which for
+        the 65816 means emulated mode
+        """
+        self.a = 0
+        self.x = 0
+        self.y = 0
+        self.sp = 0x1ff
+        self.pc = 0
+        self.p = M_FLAG | X_FLAG | I_FLAG
+        self.d = 0
+        self.dbr = 0
+        self.pbr = 0
+        self.e = 1
+        self.crossed = False
+        self.stop = None
+        self.top_sp = None
+
+    def load(self, data, address):
+        """Copy a bytes-like object into memory, starting at address"""
+        self.mem[address:address+len(data)] = data
+
+    def run(self, address, max_instructions=MAX_INSTRUCTIONS, profile=None):
+        """Run the code at address as a subroutine until it returns, or until
+        a brk, cop, stp or wai instruction. Return a tuple of the number of
+        cycles, the number of instructions, and a string with the reason we
+        stopped. The final return and brk etc are included in the counts.
+        If profile is a dictionary, it collects a list of the number of
+        times each instruction ran and the cycles it took, by address.
+        """
+        self.pbr = address >> 16
+        self.pc = address & 0xffff
+        self.stop = None
+
+        # We push a return address of our own so we know when the code returns
+        # from the subroutine: It is when the stack pointer is back here
+        self._push16(0xffff)
+        self.top_sp = self.sp
+
+        dispatch = self.dispatch
+        mem = self.mem
+        cycles = 0
+        n = 0
+
+        # The loop is written twice so we don't slow down the normal run
+        if profile is None:
+
+            while self.stop is None and n < max_instructions:
+                cycles += dispatch[mem[(self.pbr << 16) | self.pc]]()
+                n += 1
+
+        else:
+
+            while self.stop is None and n < max_instructions:
+                here = (self.pbr << 16) | self.pc
+                c = dispatch[mem[here]]()
+                cycles += c
+                n += 1
+
+                try:
+                    entry = profile[here]
+                except KeyError:
+                    profile[here] = [1, c]
+                else:
+                    entry[0] += 1
+                    entry[1] += c
+
+        if self.stop is None:
+            self.stop = f'limit of {max_instructions} instructions'
+
+        return cycles, n, self.stop
+
+    # ---- MEMORY AND STACK ----
+
+    def read(self, ea, wide):
+        """Return one byte or, if wide is true, a little-endian word"""
+        if wide:
+            return self.mem[ea] | (self.mem[(ea+1) & self.amask] << 8)
+
+        return self.mem[ea]
+
+    def write(self, ea, value, wide):
+        """Store one byte or, if wide is true, a little-endian word"""
+        self.mem[ea] = value & 0xff
+
+        if wide:
+            self.mem[(ea+1) & self.amask] = (value >> 8) & 0xff
+
+    def _read24(self, ea):
+        return self.mem[ea] | (self.mem[(ea+1) & self.amask] << 8) |\
+                (self.mem[(ea+2) & self.amask] << 16)
+
+    def _operand8(self):
+        return self.mem[(self.pbr << 16) | ((self.pc+1) & 0xffff)]
+
+    def _operand16(self):
+        base = self.pbr << 16
+        return self.mem[base | ((self.pc+1) & 0xffff)] |\
+                (self.mem[base | ((self.pc+2) & 0xffff)] << 8)
+
+    def _operand24(self):
+        return self._operand16() |\
+                (self.mem[(self.pbr << 16) | ((self.pc+3) & 0xffff)] << 16)
+
+    def _push8(self, value):
+        self.mem[self.sp] = value & 0xff
+
+        if self.e:
+            self.sp = 0x100 | ((self.sp-1) & 0xff)
+        else:
+            self.sp = (self.sp-1) & 0xffff
+
+    def _pull8(self):
+        if self.e:
+            self.sp = 0x100 | ((self.sp+1) & 0xff)
+        else:
+            self.sp = (self.sp+1) & 0xffff
+
+        return self.mem[self.sp]
+
+    def _push16(self, value):
+        self._push8(value >> 8)
+        self._push8(value)
+
+    def _pull16(self):
+        lo = self._pull8()
+        return lo | (self._pull8() << 8)
+
+    # ---- FLAGS ----
+
+    def _set_nz(self, value, wide):
+        if wide:
+            self.p = (self.p & 0x7d) | NZ16[value & 0xffff]
+        else:
+            self.p = (self.p & 0x7d) | NZ8[value & 0xff]
+
+    def _set_p(self, value):
+        """Set the status register, taking care of the register sizes"""
+        if self.e:
+            value |= M_FLAG | X_FLAG
+
+        self.p = value & 0xff
+
+        if value & X_FLAG:
+            self.x &= 0xff
+            self.y &= 0xff
+
+    def _set_a(self, value, wide):
+        if wide:
+            self.a = value & 0xffff
+        else:
+            self.a = (self.a & 0xff00) | (value & 0xff)
+
+    # ---- ADDRESSING MODES ----
+
+    # Each of these returns the effective address and moves the program
+    # counter to the next instruction. Those that can cross a page boundary
+    # tell us in self.crossed
+
+    def _make_mode(self, mode, length, op_name):
+        """Return the function for an addressing mode"""
+        mem = self.mem
+
+        def implied():
+            self.pc = (self.pc + length) & 0xffff
+
+        def immediate():
+            ea = (self.pbr << 16) | ((self.pc+1) & 0xffff)
+
+            if op_name in XY_IMM:
+                wide = not self.p & X_FLAG
+            else:
+                wide = not self.p & M_FLAG
+
+            self.pc = (self.pc + 2 + wide) & 0xffff
+            return ea
+
+        def immediate_fixed():
+            ea = (self.pbr << 16) | ((self.pc+1) & 0xffff)
+            self.pc = (self.pc + length) & 0xffff
+            return ea
+
+        def absolute():
+            pc = self.pc
+            base = self.pbr << 16
+            self.pc = (pc + 3) & 0xffff
+            return (self.dbr << 16) | mem[base | ((pc+1) & 0xffff)] |\
+                    (mem[base | ((pc+2) & 0xffff)] << 8)
+
+        def absolute_x():
+            pc = self.pc
+            bank = self.pbr << 16
+            self.pc = (pc + 3) & 0xffff
+            base = (self.dbr << 16) | mem[bank | ((pc+1) & 0xffff)] |\
+                    (mem[bank | ((pc+2) & 0xffff)] << 8)
+            ea = (base + self.x) & self.amask
+            self.crossed = bool((base ^ ea) & 0xff00)
+            return ea
+
+        def absolute_y():
+            pc = self.pc
+            bank = self.pbr << 16
+            self.pc = (pc + 3) & 0xffff
+            base = (self.dbr << 16) | mem[bank | ((pc+1) & 0xffff)] |\
+                    (mem[bank | ((pc+2) & 0xffff)] << 8)
+            ea = (base + self.y) & self.amask
+            self.crossed = bool((base ^ ea) & 0xff00)
+            return ea
+
+        def direct_page():
+            pc = self.pc
+            self.pc = (pc + 2) & 0xffff
+            return (self.d + mem[(self.pbr << 16) | ((pc+1) & 0xffff)]) & 0xffff
+
+        def dp_indexed(index):
+            def mode():
+                b = self._operand8() + getattr(self, index)
+                self.pc = (self.pc + 2) & 0xffff
+
+                # In emulated mode, we stay inside the direct page
+                if self.e and not self.d & 0xff:
+                    return self.d | (b & 0xff)
+
+                return (self.d + b) & 0xffff
+            return mode
+
+        def dp_pointer(ptr):
+            """Return the word at a pointer in the direct page"""
+            if self.e and not self.d & 0xff:
+                return self.mem[ptr] |\
+                        (self.mem[(ptr & 0xff00) | ((ptr+1) & 0xff)] << 8)
+
+            return self.read(ptr, True)
+
+        def dp_indirect():
+            ptr = (self.d + self._operand8()) & 0xffff
+            self.pc = (self.pc + 2) & 0xffff
+            return (self.dbr << 16) | dp_pointer(ptr)
+
+        dp_x = dp_indexed('x')
+
+        def dp_x_indirect():
+            ptr = dp_x()
+            return (self.dbr << 16) | dp_pointer(ptr)
+
+        def dp_indirect_y():
+            ptr = (self.d + self._operand8()) & 0xffff
+            self.pc = (self.pc + 2) & 0xffff
+            base = (self.dbr << 16) | dp_pointer(ptr)
+            ea = (base + self.y) & self.amask
+            self.crossed = bool((base ^ ea) & 0xff00)
+            return ea
+
+        def dp_indirect_long():
+            ptr = (self.d + self._operand8()) & 0xffff
+            self.pc = (self.pc + 2) & 0xffff
+            return self._read24(ptr)
+
+        def dp_indirect_long_y():
+            ptr = (self.d + self._operand8()) & 0xffff
+            self.pc = (self.pc + 2) & 0xffff
+            return (self._read24(ptr) + self.y) & self.amask
+
+        def long():
+            ea = self._operand24()
+            self.pc = (self.pc + 4) & 0xffff
+            return ea
+
+        def long_x():
+            ea = (self._operand24() + self.x) & self.amask
+            self.pc = (self.pc + 4) & 0xffff
+            return ea
+
+        def stack_relative():
+            ea = (self.sp + self._operand8()) & 0xffff
+            self.pc = (self.pc + 2) & 0xffff
+            return ea
+
+        def stack_relative_y():
+            ptr = (self.sp + self._operand8()) & 0xffff
+            self.pc = (self.pc + 2) & 0xffff
+            return (((self.dbr << 16) | self.read(ptr, True)) + self.y) & self.amask
+
+        def relative8():
+            offset = mem[(self.pbr << 16) | ((self.pc+1) & 0xffff)]
+            self.pc = (self.pc + 2) & 0xffff
+            target = (self.pc + offset - ((offset & 0x80) << 1)) & 0xffff
+            self.crossed = bool((target ^ self.pc) & 0xff00)
+            return target
+
+        def relative16():
+            offset = self._operand16()
+            self.pc = (self.pc + 3) & 0xffff
+            return (self.pc + offset) & 0xffff
+
+        # Jumps return the new address of the program counter, with the bank.
+        # They don't need to move the program counter themselves
+
+        def jump():
+            bank = self.pbr << 16
+            return bank | mem[bank | ((self.pc+1) & 0xffff)] |\
+                    (mem[bank | ((self.pc+2) & 0xffff)] << 8)
+
+        def jump_indirect():
+            ptr = self._operand16()
+
+            # The original 6502 doesn't cross pages for the pointer
+            if self.mpu == '6502':
+                return self.mem[ptr] |\
+                        (self.mem[(ptr & 0xff00) | ((ptr+1) & 0xff)] << 8)
+
+            return (self.pbr << 16) | self.read(ptr, True)
+
+        def jump_x_indirect():
+            ptr = (self.pbr << 16) | ((self._operand16() + self.x) & 0xffff)
+            return (self.pbr << 16) | self.read(ptr, True)
+
+        def jump_indirect_long():
+            return self._read24(self._operand16())
+
+        def jump_long():
+            return self._operand24()
+
+        def move():
+            return None
+
+        modes = {
+            '': implied,
+            'a': implied,
+            '#': immediate,
+            '#8': immediate_fixed,
+            '#16': immediate_fixed,
+            'x': absolute_x,
+            'y': absolute_y,
+            'd': direct_page,
+            'dx': dp_x,
+            'dy': dp_indexed('y'),
+            'di': dp_indirect,
+            'dxi': dp_x_indirect,
+            'diy': dp_indirect_y,
+            'dil': dp_indirect_long,
+            'dily': dp_indirect_long_y,
+            'l': long,
+            'lx': long_x,
+            's': stack_relative,
+            'siy': stack_relative_y,
+            'r8': relative8,
+            'r16': relative16,
+            'j': jump,
+            'ji': jump_indirect,
+            'jxi': jump_x_indirect,
+            'jil': jump_indirect_long,
+            'jl': jump_long,
+            'mv': move}
+
+        # Absolute mode has no suffix either, so we go by the length
+        if mode == '' and length == 3:
+            return absolute
+
+        return modes[mode]
+
+    # ---- DISPATCH TABLE ----
+
+    def _make_handler(self, entry):
+        """Given an entry of the opcode table, return a function that
+        executes the instruction and returns the number of cycles it took
+        """
+        opcode, mnemonic, length, base_cycles, rules = entry
+
+        if mnemonic == 'UNUSED':
+
+            def unused():
+                self.stop = f'unused opcode {opcode:02x} at '\
+                        f'{(self.pbr << 16) | self.pc:06x}'
+                return 0
+
+            return unused
+
+        if mnemonic in SPECIAL_INS:
+            name, mode = SPECIAL_INS[mnemonic]
+        else:
+            name, _, mode = mnemonic.partition('.')
+            mode = ZERO_PAGE_MODES.get(mode, mode)
+
+        if name in BRANCHES:
+            mode = 'r8'
+
+        # The immediate form of bit only changes the Zero flag
+        if mnemonic == 'bit.#':
+            op = self._op_bit_imm
+        else:
+            op = getattr(self, '_op_'+name)
+
+        get_ea = self._make_mode(mode, length, name)
+
+        # Every rule gets a test for the cycles that it adds, so we don't have
+        # to look at the rules during the run
+        tests = []
+
+        if 'm' in rules:
+            tests.append(lambda: not self.p & M_FLAG)
+
+        if 'M' in rules:
+            tests.append(lambda: 2 * (not self.p & M_FLAG))
+
+        if 'x' in rules:
+            tests.append(lambda: not self.p & X_FLAG)
+
+        if 'l' in rules:
+            tests.append(lambda: bool(self.d & 0xff))
+
+        if 'n' in rules:
+            tests.append(lambda: not self.e)
+
+        if 'p' in rules and self.is_65816:
+            tests.append(lambda: self.crossed or not self.p & X_FLAG)
+        elif 'p' in rules:
+            tests.append(lambda: self.crossed)
+
+        if 'd' in rules:
+            tests.append(lambda: bool(self.p & D_FLAG))
+
+        # Branches and block moves return their extra cycles themselves
+        if not tests:
+
+            def handler():
+                return base_cycles + (op(get_ea()) or 0)
+
+        elif len(tests) == 1:
+            test = tests[0]
+
+            def handler():
+                return base_cycles + (op(get_ea()) or 0) + test()
+
+        else:
+
+            def handler():
+                c = base_cycles + (op(get_ea()) or 0)
+
+                for t in tests:
+                    c += t()
+
+                return c
+
+        handler.__name__ = mnemonic
+        return handler
+
+    # ---- OPERATIONS ----
+
+    # Each of these gets the effective address from the addressing mode, which
+    # is None for implied and accumulator modes. They return the number of
+    # extra cycles if there are any
+
+    # -- Loads and stores --
+
+    def _op_lda(self, ea):
+        wide = not self.p & M_FLAG
+        v = self.read(ea, wide)
+        self._set_a(v, wide)
+        self._set_nz(v, wide)
+
+    def _op_ldx(self, ea):
+        wide = not self.p & X_FLAG
+        self.x = self.read(ea, wide)
+        self._set_nz(self.x, wide)
+
+    def _op_ldy(self, ea):
+        wide = not self.p & X_FLAG
+        self.y = self.read(ea, wide)
+        self._set_nz(self.y, wide)
+
+    def _op_sta(self, ea):
+        self.write(ea, self.a, not self.p & M_FLAG)
+
+    def _op_stx(self, ea):
+        self.write(ea, self.x, not self.p & X_FLAG)
+
+    def _op_sty(self, ea):
+        self.write(ea, self.y, not self.p & X_FLAG)
+
+    def _op_stz(self, ea):
+        self.write(ea, 0, not self.p & M_FLAG)
+
+    # -- Arithmetic and logic --
+
+    def _op_adc(self, ea):
+        wide = not self.p & M_FLAG
+        mask, sign, digits = (0xffff, 0x8000, 4) if wide else (0xff, 0x80, 2)
+        a = self.a & mask
+        m = self.read(ea, wide)
+        c = self.p & C_FLAG
+        r = a + m + c
+        v = (~(a ^ m) & (a ^ r)) & sign
+
+        if self.p & D_FLAG:
+            r = 0
+
+            for shift in range(0, digits*4, 4):
+                digit = ((a >> shift) & 0xf) + ((m >> shift) & 0xf) + c
+                c = digit > 9
+
+                if c:
+                    digit -= 10
+
+                r |= (digit & 0xf) << shift
+
+            r |= c * (mask+1)
+
+        self.p = (self.p & ~(C_FLAG | V_FLAG)) | (r > mask) | (bool(v) * V_FLAG)
+        self._set_a(r, wide)
+        self._set_nz(r, wide)
+
+    def _op_sbc(self, ea):
+        wide = not self.p & M_FLAG
+        mask, sign, digits = (0xffff, 0x8000, 4) if wide else (0xff, 0x80, 2)
+        a = self.a & mask
+        m = self.read(ea, wide)
+        c = self.p & C_FLAG
+        r = a + (m ^ mask) + c
+        v = (~(a ^ (m ^ mask)) & (a ^ r)) & sign
+
+        if self.p & D_FLAG:
+            r = 0
+            borrow = 1 - c
+
+            for shift in range(0, digits*4, 4):
+                digit = ((a >> shift) & 0xf) - ((m >> shift) & 0xf) - borrow
+                borrow = digit < 0
+
+                if borrow:
+                    digit += 10
+
+                r |= (digit & 0xf) << shift
+
+            r |= (not borrow) * (mask+1)
+
+        self.p = (self.p & ~(C_FLAG | V_FLAG)) | (r > mask) | (bool(v) * V_FLAG)
+        self._set_a(r, wide)
+        self._set_nz(r, wide)
+
+    def _logic(self, ea, f):
+        wide = not self.p & M_FLAG
+        r = f(self.a, self.read(ea, wide))
+        self._set_a(r, wide)
+        self._set_nz(r, wide)
+
+    def _op_and(self, ea):
+        self._logic(ea, lambda a, m: a & m)
+
+    def _op_ora(self, ea):
+        self._logic(ea, lambda a, m: a | m)
+
+    def _op_eor(self, ea):
+        self._logic(ea, lambda a, m: a ^ m)
+
+    def _compare(self, register, ea, wide):
+        m = self.read(ea, wide)
+        r = register & (0xffff if wide else 0xff)
+        self.p = (self.p & ~C_FLAG) | (r >= m)
+        self._set_nz(r - m, wide)
+
+    def _op_cmp(self, ea):
+        self._compare(self.a, ea, not self.p & M_FLAG)
+
+    def _op_cpx(self, ea):
+        self._compare(self.x, ea, not self.p & X_FLAG)
+
+    def _op_cpy(self, ea):
+        self._compare(self.y, ea, not self.p & X_FLAG)
+
+    def _op_bit_imm(self, ea):
+        wide = not self.p & M_FLAG
+        m = self.read(ea, wide)
+        z = not (self.a & m & (0xffff if wide else 0xff))
+        self.p = (self.p & ~Z_FLAG) | (z << 1)
+        return m
+
+    def _op_bit(self, ea):
+        m = self._op_bit_imm(ea)
+
+        if self.p & M_FLAG:
+            self.p = (self.p & 0x3f) | (m & (N_FLAG | V_FLAG))
+        else:
+            self.p = (self.p & 0x3f) | ((m >> 8) & (N_FLAG | V_FLAG))
+
+    def _op_tsb(self, ea):
+        wide = not self.p & M_FLAG
+        m = self.read(ea, wide)
+        self.p = (self.p & ~Z_FLAG) | ((not self.a & m & 0xffff) << 1)
+        self.write(ea, m | self.a, wide)
+
+    def _op_trb(self, ea):
+        wide = not self.p & M_FLAG
+        m = self.read(ea, wide)
+        self.p = (self.p & ~Z_FLAG) | ((not self.a & m & 0xffff) << 1)
+        self.write(ea, m & ~self.a, wide)
+
+    # -- Read-modify-write, on A if there is no address --
+
+    def _modify(self, ea, f):
+        wide = not self.p & M_FLAG
+        mask = 0xffff if wide else 0xff
+
+        if ea is None:
+            r = f(self.a & mask, wide)
+            self._set_a(r, wide)
+        else:
+            r = f(self.read(ea, wide), wide)
+            self.write(ea, r, wide)
+
+        self._set_nz(r & mask, wide)
+
+    def _op_inc(self, ea):
+        self._modify(ea, lambda v, wide: v + 1)
+
+    def _op_dec(self, ea):
+        self._modify(ea, lambda v, wide: v - 1)
+
+    def _op_asl(self, ea):
+        def f(v, wide):
+            self.p = (self.p & ~C_FLAG) | (v >> (15 if wide else 7))
+            return v << 1
+        self._modify(ea, f)
+
+    def _op_lsr(self, ea):
+        def f(v, wide):
+            self.p = (self.p & ~C_FLAG) | (v & 1)
+            return v >> 1
+        self._modify(ea, f)
+
+    def _op_rol(self, ea):
+        def f(v, wide):
+            c = self.p & C_FLAG
+            self.p = (self.p & ~C_FLAG) | (v >> (15 if wide else 7))
+            return (v << 1) | c
+        self._modify(ea, f)
+
+    def _op_ror(self, ea):
+        def f(v, wide):
+            c = self.p & C_FLAG
+            self.p = (self.p & ~C_FLAG) | (v & 1)
+            return (v >> 1) | (c << (15 if wide else 7))
+        self._modify(ea, f)
+
+    # -- Registers --
+
+    def _op_inx(self, ea):
+        wide = not self.p & X_FLAG
+        self.x = (self.x + 1) & (0xffff if wide else 0xff)
+        self._set_nz(self.x, wide)
+
+    def _op_iny(self, ea):
+        wide = not self.p & X_FLAG
+        self.y = (self.y + 1) & (0xffff if wide else 0xff)
+        self._set_nz(self.y, wide)
+
+    def _op_dex(self, ea):
+        wide = not self.p & X_FLAG
+        self.x = (self.x - 1) & (0xffff if wide else 0xff)
+        self._set_nz(self.x, wide)
+
+    def _op_dey(self, ea):
+        wide = not self.p & X_FLAG
+        self.y = (self.y - 1) & (0xffff if wide else 0xff)
+        self._set_nz(self.y, wide)
+
+    def _to_xy(self, value):
+        wide = not self.p & X_FLAG
+        value &= 0xffff if wide else 0xff
+        self._set_nz(value, wide)
+        return value
+
+    def _to_a(self, value):
+        wide = not self.p & M_FLAG
+        self._set_a(value, wide)
+        self._set_nz(value, wide)
+
+    def _op_tax(self, ea):
+        self.x = self._to_xy(self.a)
+
+    def _op_tay(self, ea):
+        self.y = self._to_xy(self.a)
+
+    def _op_tsx(self, ea):
+        self.x = self._to_xy(self.sp)
+
+    def _op_txy(self, ea):
+        self.y = self._to_xy(self.x)
+
+    def _op_tyx(self, ea):
+        self.x = self._to_xy(self.y)
+
+    def _op_txa(self, ea):
+        self._to_a(self.x)
+
+    def _op_tya(self, ea):
+        self._to_a(self.y)
+
+    def _op_txs(self, ea):
+        if self.e:
+            self.sp = 0x100 | (self.x & 0xff)
+        else:
+            self.sp = self.x
+
+    def _op_tcs(self, ea):
+        if self.e:
+            self.sp = 0x100 | (self.a & 0xff)
+        else:
+            self.sp = self.a
+
+    def _op_tsc(self, ea):
+        self.a = self.sp
+        self._set_nz(self.a, True)
+
+    def _op_tcd(self, ea):
+        self.d = self.a
+        self._set_nz(self.d, True)
+
+    def _op_tdc(self, ea):
+        self.a = self.d
+        self._set_nz(self.a, True)
+
+    def _op_xba(self, ea):
+        self.a = ((self.a >> 8) | (self.a << 8)) & 0xffff
+        self._set_nz(self.a & 0xff, False)
+
+    # -- Flags --
+
+    def _op_clc(self, ea):
+        self.p &= ~C_FLAG
+
+    def _op_sec(self, ea):
+        self.p |= C_FLAG
+
+    def _op_cld(self, ea):
+        self.p &= ~D_FLAG
+
+    def _op_sed(self, ea):
+        self.p |= D_FLAG
+
+    def _op_cli(self, ea):
+        self.p &= ~I_FLAG
+
+    def _op_sei(self, ea):
+        self.p |= I_FLAG
+
+    def _op_clv(self, ea):
+        self.p &= ~V_FLAG
+
+    def _op_rep(self, ea):
+        self._set_p(self.p & ~self.mem[ea])
+
+    def _op_sep(self, ea):
+        self._set_p(self.p | self.mem[ea])
+
+    def _op_xce(self, ea):
+        c = self.p & C_FLAG
+        self.p = (self.p & ~C_FLAG) | self.e
+        self.e = c
+
+        if self.e:
+            self.sp = 0x100 | (self.sp & 0xff)
+            self._set_p(self.p)
+
+    # -- Stack --
+
+    def _op_pha(self, ea):
+        if self.p & M_FLAG:
+            self._push8(self.a)
+        else:
+            self._push16(self.a)
+
+    def _op_phx(self, ea):
+        if self.p & X_FLAG:
+            self._push8(self.x)
+        else:
+            self._push16(self.x)
+
+    def _op_phy(self, ea):
+        if self.p & X_FLAG:
+            self._push8(self.y)
+        else:
+            self._push16(self.y)
+
+    def _op_pla(self, ea):
+        wide = not self.p & M_FLAG
+        self._to_a(self._pull16() if wide else self._pull8())
+
+    def _op_plx(self, ea):
+        wide = not self.p & X_FLAG
+        self.x = self._to_xy(self._pull16() if wide else self._pull8())
+
+    def _op_ply(self, ea):
+        wide = not self.p & X_FLAG
+        self.y = self._to_xy(self._pull16() if wide else self._pull8())
+
+    def _op_php(self, ea):
+        self._push8(self.p)
+
+    def _op_plp(self, ea):
+        self._set_p(self._pull8())
+
+    def _op_phb(self, ea):
+        self._push8(self.dbr)
+
+    def _op_plb(self, ea):
+        self.dbr = self._pull8()
+        self._set_nz(self.dbr, False)
+
+    def _op_phk(self, ea):
+        self._push8(self.pbr)
+
+    def _op_phd(self, ea):
+        self._push16(self.d)
+
+    def _op_pld(self, ea):
+        self.d = self._pull16()
+        self._set_nz(self.d, True)
+
+    def _op_pea(self, ea):
+        self._push16(self.read(ea, True))
+
+    def _op_pei(self, ea):
+        self._push16(self.read(ea, True))
+
+    def _op_per(self, ea):
+        self._push16(ea)
+
+    # -- Branches and jumps --
+
+    def _branch(self, target, flag, value):
+        if self.p & flag != value:
+            return 0
+
+        extra = 1 + (self.crossed and bool(self.e))
+        self.pc = target
+        return extra
+
+    def _make_branch(flag, value):
+        def op(self, target):
+            return self._branch(target, flag, value)
+        return op
+
+    _op_bcc = _make_branch(C_FLAG, 0)
+    _op_bcs = _make_branch(C_FLAG, C_FLAG)
+    _op_bne = _make_branch(Z_FLAG, 0)
+    _op_beq = _make_branch(Z_FLAG, Z_FLAG)
+    _op_bpl = _make_branch(N_FLAG, 0)
+    _op_bmi = _make_branch(N_FLAG, N_FLAG)
+    _op_bvc = _make_branch(V_FLAG, 0)
+    _op_bvs = _make_branch(V_FLAG, V_FLAG)
+    _op_bra = _make_branch(0, 0)
+
+    del _make_branch
+
+    def _op_brl(self, target):
+        self.pc = target
+
+    def _op_jmp(self, target):
+        self.pc = target & 0xffff
+
+    def _op_jml(self, target):
+        self.pbr = target >> 16
+        self.pc = target & 0xffff
+
+    def _op_jsr(self, target):
+        self._push16(self.pc + 2)
+        self.pc = target & 0xffff
+
+    def _op_jsl(self, target):
+        self._push8(self.pbr)
+        self._push16(self.pc + 3)
+        self.pbr = target >> 16
+        self.pc = target & 0xffff
+
+    def _op_rts(self, ea):
+        if self.sp == self.top_sp:
+            self.stop = 'rts'
+
+        self.pc = (self._pull16() + 1) & 0xffff
+
+    def _op_rtl(self, ea):
+        if self.sp == self.top_sp:
+            self.stop = 'rts.l'
+
+        self.pc = (self._pull16() + 1) & 0xffff
+        self.pbr = self._pull8()
+
+    def _op_rti(self, ea):
+        self._set_p(self._pull8())
+        self.pc = self._pull16()
+
+        if not self.e:
+            self.pbr = self._pull8()
+
+    # -- Block moves --
+
+    def _move(self, step):
+        dest = self._operand8()
+        src = self.mem[(self.pbr << 16) | ((self.pc+2) & 0xffff)]
+        mask = 0xffff if not self.p & X_FLAG else 0xff
+        mem = self.mem
+        n = 0
+
+        while True:
+            mem[(dest << 16) | self.y] = mem[(src << 16) | self.x]
+            self.x = (self.x + step) & mask
+            self.y = (self.y + step) & mask
+            self.a = (self.a - 1) & 0xffff
+            n += 1
+
+            if self.a == 0xffff:
+                break
+
+        self.dbr = dest
+        self.pc = (self.pc + 3) & 0xffff
+
+        # The table gives us the cycles for one byte
+        return 7 * (n-1)
+
+    def _op_mvn(self, ea):
+        return self._move(1)
+
+    def _op_mvp(self, ea):
+        return self._move(-1)
+
+    # -- Everything else --
+
+    def _op_nop(self, ea):
+        pass
+
+    def _op_wdm(self, ea):
+        pass
+
+    def _op_brk(self, ea):
+        self.stop = 'brk'
+
+    def _op_cop(self, ea):
+        self.stop = 'cop'
+
+    def _op_stp(self, ea):
+        self.stop = 'stp'
+
+    def _op_wai(self, ea):
+        self.stop = 'wai'
@@ -0,0 +1,121 @@
+# Tests for the Simulator of Tinkasm
+# Scot W. Stevenson <scot.stevenson@gmail.com>
+# First version: 18. Oct 2026
+# This version: 18. Oct 2026
+
+# From this directory, run "PYTHONPATH=.. python3 -m unittest" so the opcode
+# tables of the assembler are found
+
+import unittest
+
+import opcodes6502
+import opcodes65c02
+import opcodes65816
+
+from simulator import Simulator
+
+def run(mpu, table, code, address=0x1000):
+    """Load a list of bytes to address, run it and return the simulator
+    and the result
+    """
+    sim = Simulator(table.opcode_table, mpu)
+    sim.load(bytes(code), address)
+    return sim, sim.run(address)
+
+
+class TestSimulator(unittest.TestCase):
+
+    def test_6502_loop(self):
+        # ldx.# 5 / loop: dex / bne loop / rts
+        sim, r = run('6502', opcodes6502, [0xa2, 0x05, 0xca, 0xd0, 0xfd, 0x60])
+        self.assertEqual(sim.x, 0)
+        self.assertEqual(r, (2 + 5*2 + 4*3 + 2 + 6, 12, 'rts'))
+
+    def test_6502_page_cross(self):
+        # ldx.# 1 / lda.x 0x20ff / rts
+        sim, r = run('6502', opcodes6502,\
+                [0xa2, 0x01, 0xbd, 0xff, 0x20, 0x60])
+        self.assertEqual(r, (2 + 5 + 6, 3, 'rts'))
+
+    def test_6502_subroutine(self):
+        # jsr 0x1004 / rts / lda.# 0x42 / rts
+        sim, r = run('6502', opcodes6502,\
+                [0x20, 0x04, 0x10, 0x60, 0xa9, 0x42, 0x60])
+        self.assertEqual(sim.a, 0x42)
+        self.assertEqual(r, (6 + 2 + 6 + 6, 4, 'rts'))
+
+    def test_6502_adc(self):
+        # clc / lda.# 0x7f / adc.# 1 / rts
+        sim, r = run('6502', opcodes6502,\
+                [0x18, 0xa9, 0x7f, 0x69, 0x01, 0x60])
+        self.assertEqual(sim.a, 0x80)
+        self.assertTrue(sim.p & 0x40)       # overflow
+        self.assertFalse(sim.p & 0x01)      # no carry
+
+    def test_6502_decimal(self):
+        # sed / clc / lda.# 0x19 / adc.# 0x01 / rts
+        sim, r = run('6502', opcodes6502,\
+                [0xf8, 0x18, 0xa9, 0x19, 0x69, 0x01, 0x60])
+        self.assertEqual(sim.a, 0x20)
+
+    def test_6502_store(self):
+        # lda.# 0x42 / sta.z 0x10 / inc.z 0x10 / rts
+        sim, r = run('6502', opcodes6502,\
+                [0xa9, 0x42, 0x85, 0x10, 0xe6, 0x10, 0x60])
+        self.assertEqual(sim.mem[0x10], 0x43)
+
+    def test_brk(self):
+        sim, r = run('6502', opcodes6502, [0xea, 0x00, 0x00])
+        self.assertEqual(r, (2 + 7, 2, 'brk'))
+
+    def test_65c02_decimal_cycle(self):
+        # sed / adc.# 0 / rts
+        sim, r = run('65c02', opcodes65c02, [0xf8, 0x69, 0x00, 0x60])
+        self.assertEqual(r, (2 + 3 + 6, 3, 'rts'))
+
+    def test_65816_native_16_bit(self):
+        # clc / xce / rep.# 0x30 / lda.# 0x1234 / ldx.# 0x0002 / stp
+        sim, r = run('65816', opcodes65816,\
+                [0x18, 0xfb, 0xc2, 0x30, 0xa9, 0x34, 0x12,\
+                0xa2, 0x02, 0x00, 0xdb])
+        self.assertEqual(sim.a, 0x1234)
+        self.assertEqual(sim.x, 2)
+        self.assertEqual(r, (2 + 2 + 3 + 3 + 3 + 3, 6, 'stp'))
+
+    def test_65816_move(self):
+        # clc / xce / rep.# 0x30 / lda.# 2 / ldx.# 0x2000 / ldy.# 0x3000 /
+        # mvn 0,0 / stp
+        sim = Simulator(opcodes65816.opcode_table, '65816')
+        sim.load(b'abc', 0x2000)
+        sim.load(bytes([0x18, 0xfb, 0xc2, 0x30, 0xa9, 0x02, 0x00,\
+                0xa2, 0x00, 0x20, 0xa0, 0x00, 0x30, 0x54, 0x00, 0x00,\
+                0xdb]), 0x1000)
+        cycles, n, reason = sim.run(0x1000)
+        self.assertEqual(bytes(sim.mem[0x3000:0x3003]), b'abc')
+        self.assertEqual(sim.a, 0xffff)
+        self.assertEqual(cycles, 2 + 2 + 3 + 3 + 3 + 3 + 3*7 + 3)
+
+    def test_unused(self):
+        sim, r = run('6502', opcodes6502, [0x02])
+        self.assertEqual(r[2], 'unused opcode 02 at 001000')
+
+    def test_limit(self):
+        # loop: jmp loop
+        sim = Simulator(opcodes6502.opcode_table, '6502')
+        sim.load(bytes([0x4c, 0x00, 0x10]), 0x1000)
+        r = sim.run(0x1000, max_instructions=100)
+        self.assertEqual(r, (300, 100, 'limit of 100 instructions'))
+
+    def test_profile(self):
+        # ldx.# 5 / loop: dex / bne loop / rts
+        sim = Simulator(opcodes6502.opcode_table, '6502')
+        sim.load(bytes([0xa2, 0x05, 0xca, 0xd0, 0xfd, 0x60]), 0x1000)
+        profile = {}
+        sim.run(0x1000, profile=profile)
+        self.assertEqual(profile[0x1000], [1, 2])
+        self.assertEqual(profile[0x1002], [5, 10])
+        self.assertEqual(profile[0x1003], [5, 14])
+
+
+if __name__ == '__main__':
+    unittest.main()
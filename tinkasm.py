@@ -25,14 +25,16 @@ intentionally written in a "primitive" style of Python.
 
 import argparse
 import copy
+import json
 import operator
+import pickle
 import re
 import string
 import sys
 import time
 import timeit
 
-from rpnmath.rpnengine import engine
+from rpnmath.rpnengine import engine, batch_engine, define_word, NO_BATCH
 from common.common import convert_number
 
 # Check for correct version of Python
@@ -47,6 +49,8 @@ n_external_files = 0    # How many external files were loaded
 n_instructions = 0      # How many instruction lines
 n_invocations = 0       # How many macros were expanded
 n_passes = 0            # Number of passes during processing
+n_dead = 0              # How many routines can never be reached
+n_relaxed = 0           # How many branches were replaced by long forms
 n_steps = 0             # Number of steps during processing
 n_switches = 0          # How many 8/16 bit register switches on 65816
 n_warnings = 0          # How many warnings were generated
@@ -55,28 +59,148 @@ code_size = 0           # Final size in bytes
 
 ### ARGUMENTS ###
 
+def list_range(s):
+    """Given a string from the command line in the form "line:100-200" or
+    "addr:0xe000-0xe0ff", return a tuple of the kind of range and the first
+    and last entry as integers. Without a prefix, we assume source lines. A
+    single number ("line:120") is a range of one.
+    """
+    # Numbers may contain ':' as a separator, so we only cut off the prefix
+    if s.startswith(('line:', 'addr:')):
+        kind, r = s.split(':', 1)
+    else:
+        kind, r = 'line', s
+
+    w = r.split('-')
+
+    if len(w) == 1:
+        w.append(w[0])
+
+    if len(w) != 2:
+        raise argparse.ArgumentTypeError(f'Malformed range "{s}"')
+
+    f_start, start = convert_number(w[0])
+    f_end, end = convert_number(w[1])
+
+    if not f_start or not f_end or start > end:
+        raise argparse.ArgumentTypeError(f'Malformed range "{s}"')
+
+    return kind, start, end
+
+
+def definition(s):
+    """Given a string from the command line in the form "symbol=value", 
+    return a tuple of the symbol in lower case and the value as an integer.
+    """
+    name, _, value = s.partition('=')
+    f_num, r = convert_number(value.strip())
+
+    if not name.strip() or not f_num:
+        raise argparse.ArgumentTypeError(f'Malformed definition "{s}"')
+
+    return sys.intern(name.strip().lower()), r
+
+def bank_window(s):
+    """Given a string from the command line in the form "0x8000-0xffff",
+    return a tuple of the first and last address inside each bank that is
+    saved with --banks as integers.
+    """
+    w = s.split('-')
+
+    if len(w) != 2:
+        raise argparse.ArgumentTypeError(f'Malformed bank window "{s}"')
+
+    f_start, start = convert_number(w[0])
+    f_end, end = convert_number(w[1])
+
+    if not f_start or not f_end or start > end or end > 0xffff:
+        raise argparse.ArgumentTypeError(f'Malformed bank window "{s}"')
+
+    return start, end
+
 parser = argparse.ArgumentParser()
-parser.add_argument('-i', '--input', dest='source', required=True,\
-        help='Assembler source code file (required)')
+parser.add_argument('-i', '--input', dest='source',\
+        help='Assembler source code file (required unless --from-ir)')
 parser.add_argument('-ir', '--intermediate-representation',\
         action='store_true', dest='ir', default=False,\
         help='Save Intermediate Representation of assembly data (default TINK.IR)')
+parser.add_argument('--snapshot', action='store_true', default=False,\
+        help='Save binary snapshot of the IR for --from-ir (default TINK.IRB)')
+parser.add_argument('--from-ir', dest='from_ir', metavar='SNAPSHOT',\
+        help='Resume assembly from binary IR snapshot, skipping the front end')
+parser.add_argument('--banks', action='store_true', default=False,\
+        help='Also save one binary file per 64 KiB bank that has code')
+parser.add_argument('--bank-window', dest='bank_window', type=bank_window,\
+        metavar='RANGE', help='Only save this part of each bank with --banks '\
+        '("0x8000-0xffff")')
+parser.add_argument('-c', '--cycles', action='store_true', default=False,\
+        help='Add cycle counts to listing')
+parser.add_argument('-d', '--define', action='append', type=definition,\
+        metavar='SYMBOL=VALUE', help='Define symbol as if by ".equ"')
+parser.add_argument('--entry', action='append', metavar='LABEL',\
+        help='Label where code can start, for --report-dead and --strip-dead')
 parser.add_argument('-o', '--output', dest='output',\
         help='Binary output file (default TINK.BIN)', default='tink.bin')
+parser.add_argument('--object', action='store_true', default=False,\
+        help='Save relocatable object file for tinklink (default TINK.OBJ)')
+parser.add_argument('--section', action='append', type=definition,\
+        metavar='NAME=ADDRESS', help='Place section at address, overrides ".section"')
+parser.add_argument('--pages', action='store_true', default=False,\
+        help='Warn about branches and tables that cross a page boundary')
+parser.add_argument('--peephole', action='store_true', default=False,\
+        help='Remove or replace useless instructions (see manual)')
+parser.add_argument('--prune-switches', dest='prune_switches',\
+        action='store_true', default=False,\
+        help='Remove 65816 register size switches that change nothing')
+parser.add_argument('--report-dead', dest='report_dead',\
+        action='store_true', default=False,\
+        help='Warn about routines that can never be reached')
+parser.add_argument('--relax-branches', dest='relax_branches',\
+        action='store_true', default=False,\
+        help='Replace branches that are out of range by long forms')
+parser.add_argument('--strip-dead', dest='strip_dead',\
+        action='store_true', default=False,\
+        help='Remove routines that can never be reached')
+parser.add_argument('-z', '--zero-page', dest='zero_page',\
+        action='store_true', default=False,\
+        help='Use zero page (direct page) forms of instructions where possible')
 parser.add_argument('-v', '--verbose',\
         help='Display additional information', action='store_true')
 parser.add_argument('-l', '--listing', action='store_true',\
         help='Create listing file (default TINK.LST)')
 parser.add_argument('-x', '--hexdump', action='store_true',\
         help='Create ASCII hexdump listing file (default TINK.HEX)')
+parser.add_argument('-j', '--json', action='store_true',\
+        help='Save IR and symbol table as JSON Lines (default TINK.JSONL)')
+parser.add_argument('--symbols', choices=['vice', 'mame', 'py65mon', 'plain'],\
+        help='Save symbols as label file for debugger (default TINK.SYM)')
+parser.add_argument('-m', '--map', action='store_true',\
+        help='Create memory map with size per label and region (default TINK.MAP)')
+parser.add_argument('--run', metavar='LABEL',\
+        help='Run code from label in the simulator and print cycles used')
+parser.add_argument('--profile', action='store_true', default=False,\
+        help='Print hot spots of --run and add profile to listing')
 parser.add_argument('-s28', action='store_true',\
         help='Create S28 format file from binary (default TINK.S28)')
 parser.add_argument('-p', '--print', action='store_true', default=False,\
         help='Print listing to screen at end')
 parser.add_argument('-w', '--warnings', default=True,\
         help='Disable warnings (default: print them)', action='store_false')
+parser.add_argument('--list-range', dest='list_range', action='append',\
+        type=list_range, metavar='RANGE',\
+        help='Only list source lines ("line:100-200") or addresses '\
+        '("addr:0xe000-0xe0ff") in range, can be given more than once')
 args = parser.parse_args()
 
+if not args.source and not args.from_ir:
+    parser.error('an input file (-i) or a snapshot (--from-ir) is required')
+
+if args.profile and not args.run:
+    parser.error('--profile requires --run')
+
+if args.bank_window and not args.banks:
+    parser.error('--bank-window requires --banks')
+
 
 ### BASIC OUTPUT FUNCTIONS ###
 
@@ -141,15 +265,87 @@ HEX_FILE = 'tink.hex'     # Default name of hexdump file
 LIST_FILE = 'tink.lst'    # Default name of listing file
 IR_FILE = 'tink.ir'       # Default name of IR file 
 S28_FILE = 'tink.s28'     # Default name of S28 file
+JSON_FILE = 'tink.jsonl'  # Default name of JSON Lines file
+SYM_FILE = 'tink.sym'     # Default name of debugger symbol file
+MAP_FILE = 'tink.map'     # Default name of memory map file
+IR_SNAPSHOT_FILE = 'tink.irb'   # Default name of binary IR snapshot
+OBJECT_FILE = 'tink.obj'  # Default name of relocatable object file
+
+HOT_SPOTS = 20  # Number of instructions in the table of hot spots
+
+# The binary IR snapshot starts with these bytes, followed by a version byte.
+# Increase the version whenever the CodeLine class or the snapshot changes
+IR_SNAPSHOT_MAGIC = b'TINKIR'
+IR_SNAPSHOT_VERSION = 3
 
 # We store the general lists here, those specific to one processor type are put
 # in the relevant passes.
 SUPPORTED_MPUS = ['6502', '65c02', '65816']
 DATA_DIRECTIVES = ['.byte', '.word', '.long']
 
+# Kinds of entries in a '.table' and their size in bytes, and the word in the
+# math term of the table that is replaced by the index
+TABLE_WIDTHS = {'byte': 1, 'word': 2, 'long': 3}
+TABLE_INDEX = '.i'
+
+# Lines before the first '.section' directive are in this section, which starts
+# at the '.origin'. Sections marked as 'noload' reserve space but are not saved.
+# Every further '.origin' starts a section of its own, with the address added
+# to the prefix
+SECTION_DEFAULT = 'code'
+SECTION_NOLOAD = 'noload'
+SECTION_ORIGIN = 'origin_'
+
 symbol_table = {}
 anon_labels = []
 
+# Goes up every time a symbol is written, see set_symbol() and do_math()
+symbol_generation = 0
+
+# Start addresses of the sections by name, and the ones that are not saved. See
+# STEP SECTIONS. PASS BINARY adds the blocks of code of each section as tuples
+# of name, start address and bytes for the output steps
+sections = {}
+noload_sections = set()
+blocks = []
+
+# Lines of the '.origin' directives that start sections, by section name, so
+# errors about the block can point to them
+origin_lines = {}
+
+# Lines that use each word in their parameters, so we only have to go through
+# those lines when we replace a symbol, see replace_symbols()
+symbol_uses = {}
+
+# Results of math terms by the term with normalized whitespace and the state of
+# the symbol table, see do_math()
+math_cache = {}
+n_math_hits = 0
+n_math_misses = 0
+
+# For object files, the symbols we get from and give to other modules, and the
+# fixup records that tell tinklink which bytes to change, see PASS RELOCATE.
+# Keep OBJECT_VERSION in sync with tinklink/tinklink.py
+OBJECT_FORMAT = 'tinkobj'
+OBJECT_VERSION = 1
+imports = []
+exports = []
+fixups = []
+
+# Parameters of lines that used the current line symbol, before PASS LABELS
+# replaced it by the address, and the assignments in the order PASS ASSIGN
+# did them. PASS RELOCATE needs both to find out what moves with the module
+current_terms = {}
+assignments = []
+
+# Changes the assembler made to the code on its own, as tuples of the line
+# numbers and a message for the listing
+optimizations = []
+
+# Number of times each instruction was run and the cycles it took in total, by
+# address, if we were asked to profile the code in the simulator
+run_profile = {}
+
 # Line types. Start off with UNKNOWN, then are later replaced by real type as
 # discovered or added. CONTROL is added internally by the assembler for various
 # control structures
@@ -185,12 +381,15 @@ class CodeLine:
         self.mode = 'em'        # For 65816: default mode (emulated)
         self.a_width = 8        # For 65816: defalt width of A register
         self.xy_width = 8       # For 65816: default width of XY registers
+        self.section = SECTION_DEFAULT  # Name of section the line is in
 
 
 # List of all directives. Note the anonymous label character is not included
 # because this is used to keep the user from using these words as labels
 DIRECTIVES = ['.!a8', '.!a16', '.a8', '.a16', '.origin', '.axy8', '.axy16',\
         '.end', ASSIGNMENT, '.byte', '.word', '.long', '.advance', '.skip',\
+        '.align', '.table', TABLE_INDEX, '.mathdef', '.import', '.export',\
+        '.section',\
         '.native', '.emulated', '.mpu', '.save',\
         '.!xy8', '.!xy16', '.xy8', '.xy16', COMMENT_MARKER,\
         '.lsb', '.msb', '.bank', '.lshift', '.rshift', '.invert',\
@@ -238,6 +437,42 @@ def little_endian_24(line, n):
     """Given a number, return a tuple with three bytes in correct format"""
     return lsb(line, n), msb(line, n), bank(line, n)
 
+def data_terms(s):
+    """Given the parameters of a data directive as a string, return the list
+    of its comma-separated terms
+    """
+    # Make sure there is no trailing comma, or the split will produce an
+    # extra empty entry in the list, throwing our count off. We only catch
+    # one comma. We've already converted all strings and characters so we
+    # don't have to be worried we'll get one of those by mistake
+    p = s.strip()
+
+    if p[-1] == ',':
+        p = p[:-1] 
+
+    return [t.strip() for t in p.split(',')]
+
+
+def is_math_term(t):
+    """Given a stripped term, return True if it is one math term and nothing
+    else, such as '[ base 2 * ]'
+    """
+    return t[0] == LEFTMATH and t.find(RIGHTMATH) == len(t)-1
+
+
+def anonymous_target(line):
+    """Given a line object with '+' or '-' as parameter, return the address of
+    the next or previous anonymous label, or None if there is none
+    """
+    p = line.parameters.strip()   # strip() is paranoid
+
+    if p == '+':
+        return next((a for ln, a in anon_labels if ln > line.ln), None)
+
+    if p == '-':
+        return next((a for ln, a in reversed(anon_labels) if ln < line.ln), None)
+
+
 def string2bytestring(s):
     """Given a string marked with quotation marks, return a string that is a
     comma-separated list of their hex ASCII values. Assumes that there is one 
@@ -254,12 +489,35 @@ def string2bytestring(s):
     return t[:-1]
 
 
+def lower_parameters(s):
+    """Given a parameter string, return it in lower case, except for strings
+    in double quotes and characters in single quotes
+    """
+    ws = re.split(r'("[^"]*"|\'[^\']*\')', s)
+
+    # Splitting with a group returns the quoted parts at the odd indices
+    return ''.join([w if i % 2 else w.lower() for i, w in enumerate(ws)])
+
+
+def set_symbol(name, value):
+    """Given the name of a symbol and its value, add it to the symbol table.
+    All writes to the symbol table must go through here, so results of math
+    terms we remembered with the old symbols are not used again.
+    """
+    global symbol_generation
+
+    symbol_table[name] = value
+    symbol_generation += 1
+
+
 def do_math(s):
     """Given a payload string with math term inside, replace the math term by
     a string representation of the number by the math engine. What is before
     and after the math term is conserved. Returns a string representation of
     a decimal number
     """
+    global n_math_hits, n_math_misses
+
     # Save the parts that are left and right of the math term
     w1 = s.split(LEFTMATH, 1)
     pre_math = w1[0]
@@ -270,6 +528,20 @@ def do_math(s):
     ts = w2[0].split()
     rs = ''
 
+    # The same term tends to show up in lots of lines, so we remember the
+    # results. Every change to the symbol table starts a new generation, so a
+    # symbol in the term can't mean something else now. Random numbers have to
+    # be new every time
+    key = (' '.join(ts), symbol_generation)
+
+    try:
+        r = math_cache[key]
+    except KeyError:
+        n_math_misses += 1
+    else:
+        n_math_hits += 1
+        return pre_math + str(r) + post_math
+
     for t in ts: 
 
         # See if it's a number, converting it while we're at it
@@ -281,7 +553,7 @@ def do_math(s):
 
         # Okay, maybe it is a known symbol
         try:
-            s = symbol_table[t.lower()]
+            s = symbol_table[t]
         except KeyError:
             rs = rs+' '+t
         else:
@@ -293,19 +565,22 @@ def do_math(s):
     if not ok:
         fatal(line, f'Math engine failed on term: "{w2[0].strip()}"')
 
+    if not set(ts) & set(NO_BATCH):
+        math_cache[key] = r
+
     return pre_math + str(r) + post_math
 
 
-def vet_newsymbol(s):
-    """Given a word that the user wants to define as a new symbol, make sure
-    that is is legal. Does not return anything if okay, jumps to fatal error
-    if not.
+def vet_newsymbol(line, s):
+    """Given the line object and a word that the user wants to define as a new
+    symbol, make sure that is is legal. Does not return anything if okay, jumps
+    to fatal error if not.
     """
 
     # We don't allow using directives as symbols because that gets very
     # confusing really fast
     if s in DIRECTIVES:
-        fatal(line, 'Directive "{s}" cannot be redefined as a symbol')
+        fatal(line, f'Directive "{s}" cannot be redefined as a symbol')
 
     # We don't allow using mnemonics as symbols because that screws up other
     # stuff and is really weird anyway
@@ -317,41 +592,107 @@ def vet_newsymbol(s):
         fatal(line, f'Symbol "{s}" already defined')
 
 
-def replace_symbols(src):
-    """Given the list of CodeLine elements, replace the symbols we know.
-    Will find symbols in math terms, but not in .BYTE etc data 
-    directives.
+def assignment_order(src, simple=False):
+    """Given a list of line objects, return a list of the symbols, lines and
+    terms of all assignments that are not done yet, in an order where every
+    symbol comes after the other assigned symbols its term uses. If simple is
+    True, only include assignments of a single number or symbol. Aborts with a
+    fatal error that shows the whole chain if assignments depend on each other
+    in a circle.
+    """
+    pending = {}
+
+    for line in src:
+
+        if line.status == DONE or line.action != ASSIGNMENT:
+            continue
+
+        w = line.parameters.split(None, 1)
+
+        if len(w) != 2:
+            fatal(line, f'Assignment needs a symbol and a value')
+
+        if simple and len(w[1].split()) != 1:
+            continue
+
+        vet_newsymbol(line, w[0])
+        symbol = sys.intern(w[0])
+
+        if symbol in pending:
+            fatal(line, f'Symbol "{w[0]}" already defined')
+
+        pending[symbol] = (line, w[1])
+
+    # Depth-first search of the graph of which symbols uses which, adding each
+    # symbol after all the symbols it depends on. The chain is the path we took
+    # to get to the current symbol, so we can tell the user about circles
+    order = []
+    finished = set()
+
+    def visit(symbol, chain):
+
+        if symbol in finished:
+            return
+
+        line, term = pending[symbol]
+
+        if symbol in chain:
+            circle = chain[chain.index(symbol):] + [symbol]
+            fatal(line, f'Circular assignment {" -> ".join(circle)}')
+
+        for w in term.split():
+
+            if w in pending:
+                visit(w, chain + [symbol])
+
+        finished.add(symbol)
+        order.append((symbol, line, term))
+
+    for symbol in pending:
+        visit(symbol, [])
+
+    return order
+
+
+def index_symbols(line):
+    """Given a line object, add it to the index of lines that use each of
+    the words in its parameters. Any code that gives a line parameters with
+    new symbols after STEP INDEX must call this.
+    """
+    for w in set(line.parameters.split()):
+        symbol_uses.setdefault(w, []).append(line)
+
+
+def replace_symbols():
+    """Replace the symbols we know in all lines that use them, using the
+    index of symbol uses. Will find symbols in math terms, but not in .BYTE
+    etc data directives.
     """
     sr_count = 0 
 
-    for line in src: 
+    # Spliting the lines returns whatever is separated by whitespace. In data
+    # directives such as .BYTE, however, this will return the symbol with a
+    # comma tacked on, so these are not found here
+    for w in symbol_uses.keys() & symbol_table.keys():
 
-        if (line.status == DONE) or (line.type == LABEL):
-            continue 
-    
-        # We need to go word-by-word because somebody might be defining .byte 
-        # data as symbols
-        wc = []
-        ws = line.parameters.split()
+        # We don't define the number of digits because we have no idea what the
+        # number they represent are supposed to be
+        n = str(symbol_table[w])
 
-        # Spliting the lines returns whatever is separated by whitespace. In
-        # data directives such as .BYTE, however, this will return the symbol
-        # with a comma tacked on. We take care of those cases separately
-        for w in ws:
+        for line in symbol_uses.pop(w): 
 
-            try:
-                # We don't define the number of digits because we have no idea
-                # what the number they represent are supposed to be
-                w = str(symbol_table[w])
-            except KeyError:
-                pass
-            else:
-                sr_count += 1
-                line.status = MODIFIED
-            finally:
-                wc.append(w)
+            if (line.status == DONE) or (line.type == LABEL):
+                continue 
+
+            # The parameters might have changed since we indexed the line
+            ws = line.parameters.split()
 
-        line.parameters = ' '.join(wc)
+            if w not in ws:
+                continue
+
+            sr_count += ws.count(w)
+            line.parameters = ' '.join([n if x == w else x for x in ws])
+            line.status = MODIFIED
 
     verbose(f'PASS REPLACED: Replaced {sr_count} known symbol(s) with known values')
 
@@ -393,13 +734,11 @@ def convert_term(line, s):
 
     s = s.strip()
 
-    # We store all symbols in lower case, humans be damned. If the following
-    # step is omitted, upper- and mixed-case symbols will not be converted
-    # correctly when inside .BYTE directives
-    lcs = s.lower()
-    
+    # We store all symbols in lower case, humans be damned. The front end has
+    # already converted everything outside of strings and characters to lower
+    # case, so we don't have to do that here
     try:
-        r = symbol_table[lcs]
+        r = symbol_table[s]
     except KeyError:
         pass
     else:
@@ -440,6 +779,11 @@ def convert_term(line, s):
 
 # TODO make format of 6502/65c02 output prettier by eliminating whitespace
 
+# Translation table for the ASCII column of data tables in the listing. Anything
+# that would mess up the layout of the listing is shown as a dot
+PRINTABLE = str.maketrans({c: chr(c) if 0x20 <= c < 0x7f else '.'\
+        for c in range(256)})
+
 def hide_zero_address(n):
     """Given the address of an instruction, if it is zero, return an
     empty string, else return a six-character hex string
@@ -484,17 +828,150 @@ def listing_whitespace(l):
     return '        |             |'
 
 
+def cycles(l):
+    """Given a line object with an instruction, return a tuple of the minimal
+    and maximal number of cycles it takes. We use the base number and the rules
+    from the opcode table with the mode and register widths we know for the
+    line. What we can't know during assembly -- page crossings by indexing,
+    the Direct Page register, branches taken or not -- only adds to the
+    maximum. For block moves, this is the number of cycles per byte.
+    """
+    _, _, _, c_min, rules = opcode_table[mnemonics[l.action]]
+
+    # Cycles we might or might not need are collected separately
+    c_max = 0
+
+    if MPU == '65816':
+
+        if 'm' in rules and l.a_width == 16:
+            c_min += 1
+
+        if 'M' in rules and l.a_width == 16:
+            c_min += 2
+
+        if 'x' in rules and l.xy_width == 16:
+            c_min += 1
+
+        if 'n' in rules and l.mode == 'na':
+            c_min += 1
+
+        if 'l' in rules:
+            c_max += 1
+
+        # With 16 bit index registers, the extra cycle is always added
+        if 'p' in rules:
+            if l.xy_width == 16:
+                c_min += 1
+            else:
+                c_max += 1
+
+    else:
+
+        if 'p' in rules:
+            c_max += 1
+
+        if 'd' in rules:
+            c_max += 1
+
+    # For branches, we know from the offset if the target is on another page.
+    # Only the 65816 in native mode doesn't care
+    if 'b' in rules and l.bytes:
+        offset = int(l.bytes.split()[1], 16)
+        next_address = l.address + 2
+        target = next_address + offset - 256*(offset > 0x7f)
+        extra = 1
+
+        if (target ^ next_address) & 0xff00 and \
+                (MPU != '65816' or l.mode == 'em'):
+            extra += 1
+
+        # This is the one branch that is always taken
+        if l.action == 'bra':
+            c_min += extra
+        else:
+            c_max += extra
+
+    return c_min, c_min+c_max
+
+
+def cycle_string(l):
+    """Given a line object with an instruction, return a string with the
+    number of cycles for the listing, either a single number or a range
+    """
+    c_min, c_max = cycles(l)
+
+    if 'v' in opcode_table[mnemonics[l.action]][4]:
+        return f'{c_min}/byte'
+    elif c_min == c_max:
+        return str(c_min)
+    else:
+        return f'{c_min}-{c_max}'
+
+
 def listing_instruction(l):
     """Template for instructions for the Intermediate Representation. 
     Takes a line object and returns a string for writing to the file.
     Assumes that the header will be added by the caller.
     """
-    s = ' {0:6} | {1:11} | {2:36} {3}'.\
+    c = ''
+
+    if args.cycles and l.action in mnemonics:
+        c = '{0:>6}  '.format(cycle_string(l))
+
+    # Instructions that were never run are left blank so the others stand out
+    if args.profile and l.action in mnemonics:
+        count, cyc = run_profile.get(l.address, ('', ''))
+        c = c + '{0:>8} {1:>9}  '.format(count, cyc)
+
+    s = ' {0:6} | {1:11} | {2:36} {3}{4}'.\
         format(hide_zero_address(l.address), l.bytes,\
-        INDENT+INDENT+l.action+' '+l.parameters, l.il_comment)
+        INDENT+INDENT+l.action+' '+l.parameters, c, l.il_comment)
     return s 
 
 
+def profile_labels(src):
+    """Given a list of line objects, yield the lines of a table with the
+    number of instructions run and their cycles for each label, based on the
+    profile of the simulator run. Anonymous labels don't count as labels
+    """
+    total = sum(c for _, c in run_profile.values()) or 1
+    blocks = [['(origin)', 0, 0]]
+
+    yield '    Count     Cycles  Percent  Label'
+
+    for line in src:
+
+        if line.type == LABEL and line.action != LOCAL_LABEL:
+            blocks.append([line.action, 0, 0])
+            continue
+
+        if line.type == INSTRUCTION and line.address in run_profile:
+            blocks[-1][1] += run_profile[line.address][0]
+            blocks[-1][2] += run_profile[line.address][1]
+
+    for name, count, cyc in blocks:
+
+        if count:
+            yield f'{count:9} {cyc:10} {100*cyc/total:7.1f}%  {name}'
+
+
+def hot_spots(src, n=HOT_SPOTS):
+    """Given a list of line objects, yield the lines of a table of the n
+    instructions that took the most cycles during the simulator run, with
+    their line numbers so we can find them in the source code
+    """
+    total = sum(c for _, c in run_profile.values()) or 1
+    ins = [l for l in src if l.type == INSTRUCTION and l.address in run_profile]
+    ins.sort(key=lambda l: run_profile[l.address][1], reverse=True)
+
+    yield '     Line  Address     Count     Cycles  Percent  Instruction'
+
+    for l in ins[:n]:
+        count, cyc = run_profile[l.address]
+        yield f'{l.ln:5d}:{l.sec_ln:03d}   {l.address:06x} {count:9} '\
+                f'{cyc:10} {100*cyc/total:7.1f}%  {l.action} {l.parameters}'
+
+
 def listing_directive(l):
     """Template for directives for the Intermediate Representation. 
     Takes a line object and returns a string for writing to the file.
@@ -503,39 +980,30 @@ def listing_directive(l):
     table = '' 
 
     # Some directives would overflow the line, we can simplify
-    if l.action in ['.advance', '.skip', '.save']:
+    if l.action in ['.advance', '.skip', '.save', '.align']:
         b_list = '({0}x 00)'.format(l.size)
     else:
         b_list = l.bytes
 
-    # Data directives can overflow a line so we have to treat them separately
-    if l.action in DATA_DIRECTIVES:
+    # Data directives can overflow a line so we have to treat them separately.
+    # We convert the byte string to characters in one go instead of byte by
+    # byte and join the table rows at the end 
+    if l.action in DATA_DIRECTIVES or l.action == '.table':
 
         b_list = '({0} bytes)'.format(l.size)
 
         table_header = '\n'+listing_header(l)+\
                 (' '*8)+'|'+(' '*13)+'|'+INDENT+INDENT
-        table_line = table_header
-        ascii_line = ''
-        c = 0
+        hex_list = l.bytes.split()
+        chars = bytes.fromhex(l.bytes).decode('latin-1').translate(PRINTABLE)
+        rows = []
 
-        for b in l.bytes.split():
-            table_line = table_line+' {0}'.format(b)
+        for i in range(0, len(hex_list), 8):
+            table_line = table_header+' '+' '.join(hex_list[i:i+8])
+            ascii_line = ' '+' '.join(chars[i:i+8])
+            rows.append('{0:96}  -- {1}'.format(table_line, ascii_line))
 
-            char = chr(int(b, 16))
-
-            if char not in string.printable:
-                char = '.'
-
-            ascii_line = ascii_line+' '+char
-            c += 1
-            
-            if c % 8 == 0:
-                table = table+'{0:96}  -- {1}'.format(table_line, ascii_line)
-                ascii_line = ''
-                table_line = table_header 
-
-        table = table+'{0:96}  -- {1}'.format(table_line, ascii_line)
+        table = ''.join(rows)
 
     lp = INDENT+l.action+' '+l.parameters
 
@@ -578,81 +1046,213 @@ line_listing_types = {
         LABEL: listing_label }
 
 
-def make_listing(src):
-    """Given a list of line objects, return a list of strings with each
-    line processed for user output.
+def in_list_range(line, ranges):
+    """Given a line object and a list of ranges as produced by list_range(),
+    return True if the line is to be included in the listing, else False. 
+    Lines without an address (comments, whitespace, control lines) have to be
+    handled by the caller for address ranges.
     """
+    for kind, start, end in ranges:
+
+        if kind == 'line' and start <= line.ln <= end:
+            return True
+
+        if kind == 'addr' and start <= line.address <= end:
+            return True
+
+    return False
+
 
-    listing = []
+def make_listing(src, ranges=None):
+    """Given a list of line objects, yield strings with each line processed
+    for user output. The lines are produced one at a time so the caller can
+    write them straight to a file without building the whole listing in
+    memory. If a list of ranges (see list_range()) is given, only those lines
+    are included. 
+    """
 
     # Header
 
-    listing.append(TITLE_STRING)
-    listing.append(f'Code listing for file {args.source}')
-    listing.append(f'Generated on {time.asctime(time.localtime())}')
-    listing.append(f'Target MPU: {MPU}')
+    yield TITLE_STRING
+    yield f'Code listing for file {args.source}'
+    yield f'Generated on {time.asctime(time.localtime())}'
+    yield f'Target MPU: {MPU}'
 
 
     if n_external_files != 0:
-        listing.append(f'External files loaded: {n_external_files}')
+        yield f'External files loaded: {n_external_files}'
 
-    listing.append(f'Number of passes executed: {n_passes}')
-    listing.append(f'Number of steps executed: {n_steps}')
+    yield f'Number of passes executed: {n_passes}'
+    yield f'Number of steps executed: {n_steps}'
     time_end = timeit.default_timer()
-    listing.append('Assembly time: {0:.5f} seconds'.format(time_end - time_start))
+    yield 'Assembly time: {0:.5f} seconds'.format(time_end - time_start)
 
     if n_warnings != 0:
-        listing.append(f'Warnings generated: {n_warnings}')
-    listing.append('Code origin: {0:06x}'.format(LC0))
-    listing.append(f'Bytes of machine code: {code_size}')
+        yield f'Warnings generated: {n_warnings}'
+    yield 'Code origin: {0:06x}'.format(LC0)
+
+    if len(sections) > 1:
+
+        for name, start in sorted(sections.items(), key=lambda kv: kv[1]):
+
+            if name in noload_sections:
+                yield f'Section "{name}": {start:06x} (not saved)'
+            else:
+                yield f'Section "{name}": {start:06x}'
+
+    yield f'Bytes of machine code: {code_size}'
 
     # Code listing
-    listing.append('\nLISTING:')
-    listing.append('   Line  Status/Type State/Width Address     Bytes     Instruction')
+    yield '\nLISTING:'
+
+    if ranges:
+        rs = []
+
+        for kind, start, end in ranges:
+
+            if kind == 'addr':
+                rs.append(f'addresses {start:06x}-{end:06x}')
+            else:
+                rs.append(f'lines {start}-{end}')
+
+        yield 'Restricted to ' + ', '.join(rs)
+
+    yield '   Line  Status/Type State/Width Address     Bytes     Instruction'
+
+    # When we filter by address, lines without an address follow the last
+    # line that had one, so comments stay with their code
+    addr_ranges = [r for r in ranges if r[0] == 'addr'] if ranges else []
+    show = False
+    follow = False
 
     for line in src:
 
+        if ranges:
+
+            if in_list_range(line, ranges):
+                show = True
+                follow = bool(addr_ranges) and line.address != 0
+            elif line.address != 0 or not follow:
+                show = False
+                follow = False
+
+            if not show:
+                continue
+
         try:
             l = line_listing_types[line.type](line)
         except KeyError:
             fatal(line, 'ERROR: Unknown line type "{0}" in line {1}:{2}'.\
                     format(line.type, line.ln, line.sec_ln))
         else:
-            listing.append(listing_header(line) + l)
+            yield listing_header(line) + l
+
+
+    # Add cycle count for each label. Anonymous labels don't count as labels
+    # here, code before the first label is listed as "(origin)"
+    if args.cycles:
+
+        yield '\nCYCLES PER LABEL:'
+        yield 'Instructions   Cycles  Label'
+
+        block = ['(origin)', 0, 0, 0]
+        blocks = [block]
+
+        for line in src:
+
+            if line.type == LABEL and line.action != LOCAL_LABEL:
+                block = [line.action, 0, 0, 0]
+                blocks.append(block)
+                continue
+
+            if line.type != INSTRUCTION or not line.bytes:
+                continue
+
+            c_min, c_max = cycles(line)
+            block[1] += 1
+            block[2] += c_min
+            block[3] += c_max
+
+        for name, n, c_min, c_max in blocks:
+
+            if n == 0:
+                continue
+
+            if c_min == c_max:
+                c = str(c_min)
+            else:
+                c = f'{c_min}-{c_max}'
 
+            yield '{0:12} {1:>8}  {2}'.format(n, c, name)
+
+    # Add the results of the simulator run
+    if args.profile:
+
+        yield '\nPROFILE PER LABEL:'
+        yield from profile_labels(src)
+
+        yield '\nHOT SPOTS:'
+        yield from hot_spots(src)
+
+    # Add changes the assembler made on its own
+    if optimizations:
+
+        yield '\nOPTIMIZATIONS:'
+
+        for ln, sec_ln, msg in sorted(optimizations, key=lambda o: o[:2]):
+            yield f'{ln:5d}:{sec_ln:03d} {msg}'
 
     # Add macro list
-    listing.append('\nMACROS:')
+    yield '\nMACROS:'
 
     if len(macros) > 0:
 
         for m in macros.keys():
-            listing.append(f'Macro "{m}"')
+            yield f'Macro "{m}"'
 
             for ml in macros[m]:
-                listing.append(f'    {ml.action}')
+                yield f'    {ml.action}'
 
     else:
-        listing.append(INDENT+'(none)')
+        yield INDENT+'(none)'
 
 
     # Only add symbol table if we have one already
     if symbol_table:
 
-        listing.append('\nSYMBOL TABLE:')
-
-        if len(symbol_table) <= 0:
-            listing.append(' - (symbol table is empty)\n')
+        yield '\nSYMBOL TABLE:'
 
         # Find longest symbol name in table
         max_sym_len = max([len(k) for k in symbol_table.keys()])
 
         for v in sorted(symbol_table):
-            listing.append('- {0:{width}} : {1:06x}'.format(v, symbol_table[v], width=max_sym_len))
+            yield '- {0:{width}} : {1:06x}'.format(v, symbol_table[v], width=max_sym_len)
+
 
-    return listing
 
 
+def make_json(src):
+    """Given a list of line objects, yield one JSON string per record for
+    tools that would otherwise have to parse the listing. We start with a
+    header record, then one record per line, and end with the symbol table.
+    The caller adds the line feeds.
+    """
+    yield json.dumps({'record': 'header', 'source': args.source, 'mpu': MPU,\
+            'origin': LC0, 'size': code_size}, separators=(',', ':'))
+
+    for line in src:
+        yield json.dumps({'record': 'line',\
+                'ln': line.ln, 'sec_ln': line.sec_ln,\
+                'type': line.type.strip(), 'status': line.status.strip(),\
+                'action': line.action, 'parameters': line.parameters,\
+                'address': line.address, 'size': line.size,\
+                'bytes': list(bytes.fromhex(line.bytes)),\
+                'mode': line.mode, 'a_width': line.a_width,\
+                'xy_width': line.xy_width, 'section': line.section},\
+                separators=(',', ':'))
+
+    yield json.dumps({'record': 'symbols', 'symbols': symbol_table,\
+            'anonymous': anon_labels}, separators=(',', ':'))
 
 
 #####################################################################
@@ -673,143 +1273,180 @@ verbose('Beginning assembly. Timer started.')
  
 
 # -------------------------------------------------------------------
-# STEP LOAD: Load original source code and add line numbers
+# STEP FROM IR: Load binary IR snapshot if requested
+#
+# REQUIRED to skip STEP LOAD through PASS RENUMBER
 
-# Line numbers start with 1 because this is for humans. 
+# The snapshot contains everything the front end produces: The IR itself, the
+# macros, the MPU, and the counts collected so far. If we have one, we jump
+# straight to the IR. Note the two front end blocks below are only executed if
+# we are not resuming from a snapshot
 
-raw_source = []
+if args.from_ir:
 
-with open(args.source, 'r') as f:
-    for ln, ls in enumerate(f.readlines(), 1): 
-        line = CodeLine(ls.rstrip(), ln, 0)    # right strip gets rid of LF
-        raw_source.append(line)
+    with open(args.from_ir, 'rb') as f:
+        header = f.read(len(IR_SNAPSHOT_MAGIC)+1)
 
-n_steps += 1
-verbose(f'STEP LOAD: Read {len(raw_source)} lines from {args.source}')
+        if header != IR_SNAPSHOT_MAGIC+bytes([IR_SNAPSHOT_VERSION]):
+            print('FATAL: "{0}" is not a version {1} IR snapshot, aborting.'.\
+                    format(args.from_ir, IR_SNAPSHOT_VERSION))
+            sys.exit(1)
 
+        snapshot = pickle.load(f)
 
-# -------------------------------------------------------------------
-# PASS INCLUDE: Add content from external files specified by the INCLUDE
-# directive. 
-#
-# REQUIRED as first step of processing
+    MPU = snapshot['mpu']
+    ir_source = snapshot['ir']
+    macros = snapshot['macros']
+    n_comment_lines, n_empty_lines, n_external_files, n_invocations,\
+            n_passes, n_steps, n_warnings = snapshot['counts']
 
-# The .include directive must be alone in the line and the second string must be
-# the name of the file without any spaces or quotation marks. Note that this
-# means there will be no .include directives visible in the code listings, since
-# everything will be one big file
+    if not args.source:
+        args.source = snapshot['source']
 
-expanded_source = []
+    n_steps += 1
+    verbose(f'STEP FROM IR: Loaded {len(ir_source)} lines of IR from {args.from_ir}')
 
-for line in raw_source: 
 
-    # We haven't converted everything to lower case yet so we have to do it the
-    # hard way here. It is not legal to have a label in the same line as a
-    # .include directive. Any inline comment after .include is silently
-    # discarded
-    w = line.raw.split()
+if not args.from_ir:
 
-    if len(w) > 1 and w[0].lower() == '.include':
+    # -------------------------------------------------------------------
+    # STEP LOAD: Load original source code and add line numbers
 
-        # Keep the line number of the .include directive for later reference
-        # but add secondary line numbers for reference
-        with open(w[1], 'r') as f: 
+    # Line numbers start with 1 because this is for humans. 
 
-            for sln, ls in enumerate(f.readlines(), 1): 
-                nl = CodeLine(ls.rstrip(), line.ln, sln)
-                expanded_source.append(nl)
+    raw_source = []
 
-        n_external_files += 1
-        verbose(f'- Included code from file "{w[1]}"')
-    else:
-        expanded_source.append(line)
+    with open(args.source, 'r') as f:
+        for ln, ls in enumerate(f.readlines(), 1): 
+            line = CodeLine(ls.rstrip(), ln, 0)    # right strip gets rid of LF
+            raw_source.append(line)
 
-n_passes += 1
-verbose(f'PASS INCLUDE: Added {n_external_files} external file(s)')
+    n_steps += 1
+    verbose(f'STEP LOAD: Read {len(raw_source)} lines from {args.source}')
 
 
-# -------------------------------------------------------------------
-# PASS EMPTY: Process empty lines 
-#
-# REQUIRES inclusion of all lines from all includes
-# REQUIRED for search for MPU type
+    # -------------------------------------------------------------------
+    # PASS INCLUDE: Add content from external files specified by the INCLUDE
+    # directive. 
+    #
+    # REQUIRED as first step of processing
 
-# We want to cut down the number of lines we have to process as early as
-# possible, so we handle empty lines right now 
+    # The .include directive must be alone in the line and the second string must be
+    # the name of the file without any spaces or quotation marks. Note that this
+    # means there will be no .include directives visible in the code listings, since
+    # everything will be one big file
 
-for line in expanded_source: 
+    expanded_source = []
 
-    if not line.raw.strip():
-        line.type = WHITESPACE
-        line.status = DONE
-        n_empty_lines += 1
+    for line in raw_source: 
 
-n_passes += 1
-verbose(f'PASS EMPTY: Found {n_empty_lines} empty line(s)')
+        # We haven't converted everything to lower case yet so we have to do it the
+        # hard way here. It is not legal to have a label in the same line as a
+        # .include directive. Any inline comment after .include is silently
+        # discarded
+        w = line.raw.split()
 
+        if len(w) > 1 and w[0].lower() == '.include':
 
-# -------------------------------------------------------------------
-# PASS COMMENTS: Remove comments that span whole lines
-#
-# REQUIRES inclusion of all lines from all includes
+            # Keep the line number of the .include directive for later reference
+            # but add secondary line numbers for reference
+            with open(w[1], 'r') as f: 
 
-for line in expanded_source: 
+                for sln, ls in enumerate(f.readlines(), 1): 
+                    nl = CodeLine(ls.rstrip(), line.ln, sln)
+                    expanded_source.append(nl)
 
-    if line.status == DONE:
-        continue
+            n_external_files += 1
+            verbose(f'- Included code from file "{w[1]}"')
+        else:
+            expanded_source.append(line)
 
-    # Whole-line comment marked by ';'
-    if line.raw.strip()[0] == COMMENT_MARKER:
-        line.type = COMMENT
-        line.status = DONE
-        n_comment_lines +=1
+    n_passes += 1
+    verbose(f'PASS INCLUDE: Added {n_external_files} external file(s)')
 
-n_passes += 1
-verbose(f'PASS COMMENTS: Found {n_comment_lines} full-line comment(s)')
 
+    # -------------------------------------------------------------------
+    # PASS EMPTY: Process empty lines 
+    #
+    # REQUIRES inclusion of all lines from all includes
+    # REQUIRED for search for MPU type
 
-# -------------------------------------------------------------------
-# PASS MPU: Find MPU type
-#
-# REQUIRES inclusion of all lines from all includes
-# REQUIRES that empty lines have been identified
-# ASSUMES that no directives have been processed yet
-# REQUIRED for loading mnemonics list 
+    # We want to cut down the number of lines we have to process as early as
+    # possible, so we handle empty lines right now 
 
-for line in expanded_source: 
+    for line in expanded_source: 
 
-    if line.status == DONE:
-        continue
+        if not line.raw.strip():
+            line.type = WHITESPACE
+            line.status = DONE
+            n_empty_lines += 1
 
-    # We haven't converted to lower case yet so we have to do this by hand 
-    # It is not legal to have a label in the same line as the .mpu
-    # directive. Any inline comment after .mpu is silently discarded
-    s = line.raw.lstrip()
-    w = s.split()
-    w1 = w[0]       # get first word in line 
+    n_passes += 1
+    verbose(f'PASS EMPTY: Found {n_empty_lines} empty line(s)')
 
-    if w1.lower() != '.mpu': 
-        continue
 
-    try: 
-        MPU = w[1]      # get second word in line
-    except IndexError:
-        fatal(line, 'No MPU given with ".mpu" directive')
-    else:
-        line.type = DIRECTIVE
-        line.status = DONE 
-        line.action = '.mpu'
-        line.parameters = MPU
-        break
+    # -------------------------------------------------------------------
+    # PASS COMMENTS: Remove comments that span whole lines
+    #
+    # REQUIRES inclusion of all lines from all includes
 
-if MPU not in SUPPORTED_MPUS:
-    fatal(line, f'MPU "{MPU}" not supported')
+    for line in expanded_source: 
 
-if not MPU:
-    fatal(line, 'No ".mpu" directive found')
+        if line.status == DONE:
+            continue
 
-n_passes += 1
-verbose(f'PASS MPU: Found MPU "{MPU}", this MPU is supported')
+        # Whole-line comment marked by ';'
+        if line.raw.strip()[0] == COMMENT_MARKER:
+            line.type = COMMENT
+            line.status = DONE
+            n_comment_lines +=1
+
+    n_passes += 1
+    verbose(f'PASS COMMENTS: Found {n_comment_lines} full-line comment(s)')
+
+
+    # -------------------------------------------------------------------
+    # PASS MPU: Find MPU type
+    #
+    # REQUIRES inclusion of all lines from all includes
+    # REQUIRES that empty lines have been identified
+    # ASSUMES that no directives have been processed yet
+    # REQUIRED for loading mnemonics list 
+
+    for line in expanded_source: 
+
+        if line.status == DONE:
+            continue
+
+        # We haven't converted to lower case yet so we have to do this by hand 
+        # It is not legal to have a label in the same line as the .mpu
+        # directive. Any inline comment after .mpu is silently discarded
+        s = line.raw.lstrip()
+        w = s.split()
+        w1 = w[0]       # get first word in line 
+
+        if w1.lower() != '.mpu': 
+            continue
+
+        try: 
+            MPU = w[1]      # get second word in line
+        except IndexError:
+            fatal(line, 'No MPU given with ".mpu" directive')
+        else:
+            line.type = DIRECTIVE
+            line.status = DONE 
+            line.action = '.mpu'
+            line.parameters = MPU
+            break
+
+    if MPU not in SUPPORTED_MPUS:
+        fatal(line, f'MPU "{MPU}" not supported')
+
+    if not MPU:
+        fatal(line, 'No ".mpu" directive found')
+
+    n_passes += 1
+    verbose(f'PASS MPU: Found MPU "{MPU}", this MPU is supported')
 
 
 # -------------------------------------------------------------------
@@ -840,7 +1477,7 @@ verbose(f'STEP OPCODES: Loaded opcode table for MPU {MPU}')
 #
 # REQUIRES opcodes loaded depending on CPU type
 
-mnemonics = {opcode_table[n][1]:n for n, e in enumerate(opcode_table)}
+mnemonics = {sys.intern(opcode_table[n][1]):n for n, e in enumerate(opcode_table)}
 
 # For the 6502 and 65c02, we have 'UNUSED' for the entries in the opcode table
 # that are, well, not used. We get rid of them here. The 65816 does not have 
@@ -853,564 +1490,571 @@ verbose('STEP MNEMONICS: Generated mnemonics list')
 verbose(f'- Number of mnemonics found: {len(mnemonics.keys())}')
 
 
-# -------------------------------------------------------------------
-# PASS SPLIT LABEL: Move labels to their own line
-#
-# REQUIRES inclusion of all lines from all includes
-# REQUIRES list of legal mnemonics available
-# ASSUMES all empty lines have been taken care of 
+# Back to the front end if we are not resuming from a snapshot
 
-# Though Simpler Assembler Notation requires labels to be in a separate line, we
-# should be able to assemble code that hasn't been correctly formatted.
+if not args.from_ir:
 
-relabeled_source = []
+    # -------------------------------------------------------------------
+    # PASS SPLIT LABEL: Move labels to their own line
+    #
+    # REQUIRES inclusion of all lines from all includes
+    # REQUIRES list of legal mnemonics available
+    # ASSUMES all empty lines have been taken care of 
 
-# This is pretty short for a function but we might be changing the requirements
-# for labels again at some point (such as, must start with a letter).
-def is_label(s):
-    """Given a string without whitespace, check to see if it ends in a colon,
-    which defines it as a label.
-    """
-    have_label = False # most words will not be labels
-    if s[-1] == LABEL_MARKER:
-        have_label = True
+    # Though Simpler Assembler Notation requires labels to be in a separate line, we
+    # should be able to assemble code that hasn't been correctly formatted.
 
-    return have_label
+    relabeled_source = []
 
+    # This is pretty short for a function but we might be changing the requirements
+    # for labels again at some point (such as, must start with a letter).
+    def is_label(s):
+        """Given a string without whitespace, check to see if it ends in a colon,
+        which defines it as a label.
+        """
+        have_label = False # most words will not be labels
+        if s[-1] == LABEL_MARKER:
+            have_label = True
 
-for line in expanded_source: 
+        return have_label
 
-    if line.status == DONE:
-        relabeled_source.append(line) 
-        continue
 
-    # While we're at it, we save information about the other lines that we get
-    # as a side effect
+    for line in expanded_source: 
 
-    # w has to have at least one word because we've gotten rid of all empty
-    # lines
-    w = line.raw.split()
-    w1 = w[0]
+        if line.status == DONE:
+            relabeled_source.append(line) 
+            continue
 
-    # Directives start with a dot. We just remember that we've found one, but
-    # don't process it yet
-    if w1[0] == '.':
-        line.type = DIRECTIVE
-        relabeled_source.append(line) 
-        continue 
-        
-    # We know all our mnemonics. We just remember that we've found one, but
-    # don't process it yet. Silly user might have given us uppercase mnemonics,
-    # but we accept this gracefully for the moment and stick it to him later
-    if w1.lower() in mnemonics:
-        line.type = INSTRUCTION
-        relabeled_source.append(line) 
-        continue 
+        # While we're at it, we save information about the other lines that we get
+        # as a side effect
 
-    # We should have a label. For the moment, we just group anonymous labels
-    # with normal labels.
-    if (not w1 == LOCAL_LABEL) and (not is_label(w1)):
-        fatal(line, f'Expecting label, found "{w1}", label missing ":"?')
+        # w has to have at least one word because we've gotten rid of all empty
+        # lines
+        w = line.raw.split()
+        w1 = w[0]
 
-    # We put the label in the action field of the line for later processing
-    line.type = LABEL
-    line.status = MODIFIED
-    line.action = w1.strip() 
+        # Directives start with a dot. We just remember that we've found one, but
+        # don't process it yet
+        if w1[0] == '.':
+            line.type = DIRECTIVE
+            relabeled_source.append(line) 
+            continue 
 
-    # If there was only one word in the line, it has to be the label and
-    # we can go on to the next line as quickly as possible
-    if len(w) == 1:
-        relabeled_source.append(line) 
-        continue 
+        # We know all our mnemonics. We just remember that we've found one, but
+        # don't process it yet. Silly user might have given us uppercase mnemonics,
+        # but we accept this gracefully for the moment and stick it to him later
+        if w1.lower() in mnemonics:
+            line.type = INSTRUCTION
+            relabeled_source.append(line) 
+            continue 
+
+        # We should have a label. For the moment, we just group anonymous labels
+        # with normal labels.
+        if (not w1 == LOCAL_LABEL) and (not is_label(w1)):
+            fatal(line, f'Expecting label, found "{w1}", label missing ":"?')
+
+        # We put the label in the action field of the line for later processing.
+        # Like all other identifiers, labels are in lower case from here on
+        line.type = LABEL
+        line.status = MODIFIED
+        line.action = sys.intern(w1.strip().lower())
 
-    # Nope, there is more on the line. We create a new line and come back and
-    # figure it out what it was. We delete the label from the string. Note this
-    # can lead to weird effects if the label string appears again in the rest of
-    # the line - say, an inline comment - but we'll live with that risk for now
-    rest_of_line = line.raw.replace(w1, '').strip()
-
-    # We check again if this is an instruction or a directive. The duplication
-    # of code is annoying, but makes processing faster because we bug out of
-    # simple directive lines earlier
-    rw = rest_of_line.split()
-    rw1 = rw[0]
-
-    # The simple case is that we have a comment after the label, and can just
-    # put it in the inline comment field without adding another line
-    if rw1[0] == ';':
-        line.il_comment = rest_of_line.strip()
+        # If there was only one word in the line, it has to be the label and
+        # we can go on to the next line as quickly as possible
+        if len(w) == 1:
+            relabeled_source.append(line) 
+            continue 
+
+        # Nope, there is more on the line. We create a new line and come back and
+        # figure it out what it was. We delete the label from the string. Note this
+        # can lead to weird effects if the label string appears again in the rest of
+        # the line - say, an inline comment - but we'll live with that risk for now
+        rest_of_line = line.raw.replace(w1, '').strip()
+
+        # We check again if this is an instruction or a directive. The duplication
+        # of code is annoying, but makes processing faster because we bug out of
+        # simple directive lines earlier
+        rw = rest_of_line.split()
+        rw1 = rw[0]
+
+        # The simple case is that we have a comment after the label, and can just
+        # put it in the inline comment field without adding another line
+        if rw1[0] == ';':
+            line.il_comment = rest_of_line.strip()
+            relabeled_source.append(line) 
+            continue
+
+        # Whatever happens now, the label itself is safe
         relabeled_source.append(line) 
-        continue
 
-    # Whatever happens now, the label itself is safe
-    relabeled_source.append(line) 
+        if rw1[0] == '.':
+            newline = CodeLine(rest_of_line, line.ln, 1)
+            newline.type = DIRECTIVE
+            relabeled_source.append(newline) 
+            continue
 
-    if rw1[0] == '.':
-        newline = CodeLine(rest_of_line, line.ln, 1)
-        newline.type = DIRECTIVE
-        relabeled_source.append(newline) 
-        continue
+        if rw1.lower() in mnemonics:
+            newline = CodeLine(rest_of_line, line.ln, 1)
+            newline.type = INSTRUCTION
+            relabeled_source.append(newline) 
+            continue
 
-    if rw1.lower() in mnemonics:
-        newline = CodeLine(rest_of_line, line.ln, 1)
-        newline.type = INSTRUCTION
-        relabeled_source.append(newline) 
-        continue
+        # If we reach this point, we have something weird on the new line and give
+        # up with a fatal error
+        fatal(line, f'Unidentified characters "{rest_of_line}" after label')
 
-    # If we reach this point, we have something weird on the new line and give
-    # up with a fatal error
-    fatal(line, f'Unidentified characters "{rest_of_line}" after label')
+    n_passes += 1
+    verbose('PASS SPLIT LABELS: Split lines that have code following their labels')
 
-n_passes += 1
-verbose('PASS SPLIT LABELS: Split lines that have code following their labels')
 
+    # -------------------------------------------------------------------
+    # CLAIM: All labels should now be in a line of their own. Also, all directives
+    # and instruction lines should be identified 
 
-# -------------------------------------------------------------------
-# CLAIM: All labels should now be in a line of their own. Also, all directives
-# and instruction lines should be identified 
+    verbose('CLAMING all labels are in a line of their own')
 
-verbose('CLAMING all labels are in a line of their own')
 
+    # -------------------------------------------------------------------
+    # PASS VALIDATE TYPE: Confirm the type of every single line is known
+    #
+    # REQUIRES labels to be in own lines
+    # REQUIRES all types to have been identified
 
-# -------------------------------------------------------------------
-# PASS VALIDATE TYPE: Confirm the type of every single line is known
-#
-# REQUIRES labels to be in own lines
-# REQUIRES all types to have been identified
+    # This step does not change the source
 
-# This step does not change the source
+    for line in relabeled_source:
 
-for line in relabeled_source:
+        if line.type == UNKNOWN:
+            fatal(line, 'Line of unknown type remaining after processing')
 
-    if line.type == UNKNOWN:
-        fatal(line, 'Line of unknown type remaining after processing')
+    n_passes += 1
+    verbose('PASS VALIDATE TYPE: All lines are of known type')
 
-n_passes += 1
-verbose('PASS VALIDATE TYPE: All lines are of known type')
 
+    # -------------------------------------------------------------------
+    # PASS INLINE COMMENTS: Isolate inline comments
+    #
+    # REQUIRES all types to have been identified
+    # REQUIRES all types to be in a line of their own 
 
-# -------------------------------------------------------------------
-# PASS INLINE COMMENTS: Isolate inline comments
-#
-# REQUIRES all types to have been identified
-# REQUIRES all types to be in a line of their own 
+    for line in relabeled_source:
 
-for line in relabeled_source:
+        if line.status == DONE:
+            continue
 
-    if line.status == DONE:
-        continue
+        # For the moment, we put "non_comment" (the actual directive or instructions
+        # with any operands etc) in the parameters field
+        if line.type == DIRECTIVE or line.type == INSTRUCTION:
 
-    # For the moment, we put "non_comment" (the actual directive or instructions
-    # with any operands etc) in the parameters field
-    if line.type == DIRECTIVE or line.type == INSTRUCTION:
+            # Since we haven't converted strings to bytes yet, we might still have
+            # a COMMENT_MARKER in a string. To get those, we need to go a bit more
+            # low-level than we would have liked: Going from left to right, find the
+            # first COMMENT_MARKER in the line that is not inside a string and split
+            # there
 
-        # Since we haven't converted strings to bytes yet, we might still have
-        # a COMMENT_MARKER in a string. To get those, we need to go a bit more
-        # low-level than we would have liked: Going from left to right, find the
-        # first COMMENT_MARKER in the line that is not inside a string and split
-        # there
-        
-        # First, though, we deal with the easy case:
-        if COMMENT_MARKER not in line.raw:
-            line.parameters = line.raw
-            continue 
+            # First, though, we deal with the easy case:
+            if COMMENT_MARKER not in line.raw:
+                line.parameters = line.raw
+                continue 
 
-        # We now know that there is at least one COMMENT_MARKER somewhere in the
-        # line
-        ls = len(line.raw)
-        dq_count = 0    # number of double quote chars
-        sq_count = 0    # number of single quote chars
-        line.parameters = ''
-        line.il_comment = ''
+            # We now know that there is at least one COMMENT_MARKER somewhere in the
+            # line
+            ls = len(line.raw)
+            dq_count = 0    # number of double quote chars
+            sq_count = 0    # number of single quote chars
+            line.parameters = ''
+            line.il_comment = ''
 
-        for i in range(ls):
+            for i in range(ls):
 
-            if line.raw[i] == '"':
-                dq_count += 1
-                continue
+                if line.raw[i] == '"':
+                    dq_count += 1
+                    continue
 
-            if line.raw[i] == "'":
-                sq_count += 1
-                continue
+                if line.raw[i] == "'":
+                    sq_count += 1
+                    continue
 
-            if line.raw[i] == COMMENT_MARKER:
+                if line.raw[i] == COMMENT_MARKER:
 
-                # A COMMENT_MARKER is inside a string if there is an odd number
-                # of quotation marks to its left
-                if (dq_count % 2 == 0) and (sq_count % 2 == 0):
+                    # A COMMENT_MARKER is inside a string if there is an odd number
+                    # of quotation marks to its left
+                    if (dq_count % 2 == 0) and (sq_count % 2 == 0):
 
-                    line.parameters = line.raw[:i]
-                    line.il_comment = line.raw[i+1:].strip()
-                    break
+                        line.parameters = line.raw[:i]
+                        line.il_comment = line.raw[i+1:].strip()
+                        break
 
-        if not line.parameters:
-            line.parameters = line.raw
+            if not line.parameters:
+                line.parameters = line.raw
 
-   
-n_passes += 1
-verbose('PASS INLINE COMMENTS: Isolated all inline comments')
 
+    n_passes += 1
+    verbose('PASS INLINE COMMENTS: Isolated all inline comments')
 
-# -------------------------------------------------------------------
-# PASS SPLIT OPERATIONS: For directives and instructions, split into
-# directive/parameter or opcode/operand pairs. Convert directives and opcodes to
-# lower case. After this pass, we don't access the raw line string anymore
-#
-# REQUIRES all types to be in a line of their own
-# REQUIRES all lines to have been identified by type
-# REQUIRES all inline comments to have been removed
-# ASSUMES that the directives and instructions are in the parameter field
 
-for line in relabeled_source:
+    # -------------------------------------------------------------------
+    # PASS SPLIT OPERATIONS: For directives and instructions, split into
+    # directive/parameter or opcode/operand pairs. Convert directives, opcodes and
+    # the parameters to lower case, except for strings and characters, so nobody
+    # after this has to. We intern the actions so looking them up is fast. After
+    # this pass, we don't access the raw line string anymore
+    #
+    # REQUIRES all types to be in a line of their own
+    # REQUIRES all lines to have been identified by type
+    # REQUIRES all inline comments to have been removed
+    # ASSUMES that the directives and instructions are in the parameter field
 
-    if line.status == DONE:
-        continue
+    for line in relabeled_source:
 
-    if line.type == DIRECTIVE or line.type == INSTRUCTION:
-        w = line.parameters.split() 
-        w1 = w[0]
-        line.action = w[0].lower()
-        line_rest = line.parameters.replace(w1, '').strip()
-        line.parameters = line_rest
+        if line.status == DONE:
+            continue
 
-n_passes += 1
-verbose('PASS SPLIT OPERATIONS: Isolated active word/parameters')
+        if line.type == DIRECTIVE or line.type == INSTRUCTION:
+            w = line.parameters.split() 
+            w1 = w[0]
+            line.action = sys.intern(w[0].lower())
+            line_rest = line.parameters.replace(w1, '').strip()
+            line.parameters = lower_parameters(line_rest)
+
+    n_passes += 1
+    verbose('PASS SPLIT OPERATIONS: Isolated active word/parameters')
 
 
-# -------------------------------------------------------------------
-# PASS MODES: Handle '.native' and '.emulated' directives on the 65816
-#
-# REQUIRES all directives to be in action field of their line
+    # -------------------------------------------------------------------
+    # PASS MODES: Handle '.native' and '.emulated' directives on the 65816
+    #
+    # REQUIRES all directives to be in action field of their line
 
-# TODO refactor this mess once we're sure it works
+    # TODO refactor this mess once we're sure it works
 
-modes_source = []
+    modes_source = []
 
-if MPU == '65816':
+    if MPU == '65816':
 
-    for line in relabeled_source:
+        for line in relabeled_source:
 
-        if line.status == DONE or line.type != DIRECTIVE:
-            modes_source.append(line)
-            continue
+            if line.status == DONE or line.type != DIRECTIVE:
+                modes_source.append(line)
+                continue
 
-        if line.action == '.native':
+            if line.action == '.native':
 
-            clc_line = CodeLine(INDENT+line.action, line.ln, 1)
-            clc_line.action = 'clc'
-            clc_line.type = INSTRUCTION
-            clc_line.status = MODIFIED
-            modes_source.append(clc_line)
+                clc_line = CodeLine(INDENT+line.action, line.ln, 1)
+                clc_line.action = 'clc'
+                clc_line.type = INSTRUCTION
+                clc_line.status = MODIFIED
+                modes_source.append(clc_line)
 
-            xce_line = CodeLine(INDENT+line.action, line.ln, 2)
-            xce_line.action = 'xce'
-            xce_line.type = INSTRUCTION
-            xce_line.status = MODIFIED
-            modes_source.append(xce_line)
+                xce_line = CodeLine(INDENT+line.action, line.ln, 2)
+                xce_line.action = 'xce'
+                xce_line.type = INSTRUCTION
+                xce_line.status = MODIFIED
+                modes_source.append(xce_line)
 
-            bang_line = CodeLine(INDENT+line.action, line.ln, 3)
-            bang_line.action = '.!native'
-            bang_line.type = CONTROL
-            bang_line.status = MODIFIED
-            modes_source.append(bang_line)
+                bang_line = CodeLine(INDENT+line.action, line.ln, 3)
+                bang_line.action = '.!native'
+                bang_line.type = CONTROL
+                bang_line.status = MODIFIED
+                modes_source.append(bang_line)
 
-            continue
+                continue
 
-        if line.action == '.emulated':
-
-            sec_line = CodeLine(INDENT+line.action, line.ln, 1)
-            sec_line.action = 'sec'
-            sec_line.type = INSTRUCTION
-            sec_line.status = MODIFIED
-            modes_source.append(sec_line)
-
-            xce_line = CodeLine(INDENT+line.action, line.ln, 2)
-            xce_line.action = 'xce'
-            xce_line.type = INSTRUCTION
-            xce_line.status = MODIFIED
-            modes_source.append(xce_line)
-
-            bang_line = CodeLine(INDENT+line.action, line.ln, 3)
-            bang_line.action = '.!emulated'
-            bang_line.type = CONTROL
-            bang_line.status = MODIFIED
-            modes_source.append(bang_line)
-
-            # Emulation drops us into 8-bit modes for A, X, and Y
-            # automatically, no REP or SEP commands needed
-            bang_line = CodeLine(INDENT+line.action, line.ln, 4)
-            bang_line.action = '.!a8'
-            bang_line.type = CONTROL
-            bang_line.status = MODIFIED
-            modes_source.append(bang_line)
-
-            bang_line = CodeLine(INDENT+line.action, line.ln, 5)
-            bang_line.action = '.!xy8'
-            bang_line.type = CONTROL
-            bang_line.status = MODIFIED
-            modes_source.append(bang_line)
+            if line.action == '.emulated':
+
+                sec_line = CodeLine(INDENT+line.action, line.ln, 1)
+                sec_line.action = 'sec'
+                sec_line.type = INSTRUCTION
+                sec_line.status = MODIFIED
+                modes_source.append(sec_line)
+
+                xce_line = CodeLine(INDENT+line.action, line.ln, 2)
+                xce_line.action = 'xce'
+                xce_line.type = INSTRUCTION
+                xce_line.status = MODIFIED
+                modes_source.append(xce_line)
+
+                bang_line = CodeLine(INDENT+line.action, line.ln, 3)
+                bang_line.action = '.!emulated'
+                bang_line.type = CONTROL
+                bang_line.status = MODIFIED
+                modes_source.append(bang_line)
+
+                # Emulation drops us into 8-bit modes for A, X, and Y
+                # automatically, no REP or SEP commands needed
+                bang_line = CodeLine(INDENT+line.action, line.ln, 4)
+                bang_line.action = '.!a8'
+                bang_line.type = CONTROL
+                bang_line.status = MODIFIED
+                modes_source.append(bang_line)
+
+                bang_line = CodeLine(INDENT+line.action, line.ln, 5)
+                bang_line.action = '.!xy8'
+                bang_line.type = CONTROL
+                bang_line.status = MODIFIED
+                modes_source.append(bang_line)
 
-            continue
+                continue
 
-        # If we get here, just save the line, like, whatever
-        modes_source.append(line)
+            # If we get here, just save the line, like, whatever
+            modes_source.append(line)
 
-    n_passes += 1
-    verbose('PASS MODES: Handled 65816 native/emulated mode switches')
+        n_passes += 1
+        verbose('PASS MODES: Handled 65816 native/emulated mode switches')
 
-else:
-    modes_source = relabeled_source
+    else:
+        modes_source = relabeled_source
 
 
-# -------------------------------------------------------------------
-# PASS REP/SEP: Warn if there are any direct REP/SEP 
-#
-# Must come before we handle the register size switches. 
+    # -------------------------------------------------------------------
+    # PASS REP/SEP: Warn if there are any direct REP/SEP 
+    #
+    # Must come before we handle the register size switches. 
 
-if MPU == '65816': 
+    if MPU == '65816': 
 
-    verbose('PASS REP/SEP: Check for naked rep.#/sep.# instructions')
+        verbose('PASS REP/SEP: Check for naked rep.#/sep.# instructions')
 
-    for line in modes_source:
+        for line in modes_source:
 
-        if line.type != INSTRUCTION:
-            continue
+            if line.type != INSTRUCTION:
+                continue
 
-        if line.action == 'rep.#' or line.action == 'sep.#':
-            warning('"{0}" in line {1}, switch will not be recognized'.\
-                    format(line.action, line.ln))
-            warning('Use register size directives such as .A8 instead')
+            if line.action == 'rep.#' or line.action == 'sep.#':
+                warning('"{0}" in line {1}, switch will not be recognized'.\
+                        format(line.action, line.ln))
+                warning('Use register size directives such as .A8 instead')
 
-    n_passes += 1
+        n_passes += 1
 
 
-# -------------------------------------------------------------------
-# PASS AXY: Handle register size switches on the 65816
+    # -------------------------------------------------------------------
+    # PASS AXY: Handle register size switches on the 65816
 
-# We add the actual REP/SEP instructions as well as internal directives for the
-# following steps.
+    # We add the actual REP/SEP instructions as well as internal directives for the
+    # following steps.
 
-axy_source = []
+    axy_source = []
 
-# We don't need to define these if we're not using a 65816
-if MPU == '65816':
+    # We don't need to define these if we're not using a 65816
+    if MPU == '65816':
 
-    AXY_INS = {'.a8': (('sep.#', '20', INSTRUCTION),\
-                      ('.!a8', '', CONTROL)),\
-               '.a16': (('rep.#', '20', INSTRUCTION),\
-                       ('.!a16', '', CONTROL)),\
-               '.xy8': (('sep.#', '10', INSTRUCTION),\
-                       ('.!xy8', '', CONTROL)),\
-               '.xy16': (('rep.#', '10', INSTRUCTION),\
-                        ('.!xy16', '', CONTROL)),\
-               '.axy8': (('sep.#', '30', INSTRUCTION),\
-                        ('.!a8', '', CONTROL),\
-                        ('.!xy8', '', CONTROL)),\
-               '.axy16': (('rep.#', '30', INSTRUCTION),\
-                         ('.!a16', '', CONTROL),\
-                         ('.!xy16', '', CONTROL))}
-
-    for line in modes_source: 
-
-        have_found = False
-
-        # Walk through every control directive for every line
-        for ins in AXY_INS:
-
-            # Because we moved labels to their own lines, we can assume that
-            # register switches are alone in the line
-            if ins in line.action:
-
-                for e in AXY_INS[ins]:
-                    nl = CodeLine(INDENT+line.action, line.ln, 1)
-                    nl.action = e[0]
-                    nl.parameters = e[1]
-                    nl.type = e[2]
-                    nl.status = MODIFIED
-
-                    axy_source.append(nl)
-                    have_found = True
-
-        if not have_found:
-            axy_source.append(line)
+        AXY_INS = {'.a8': (('sep.#', '0x20', INSTRUCTION),\
+                          ('.!a8', '', CONTROL)),\
+                   '.a16': (('rep.#', '0x20', INSTRUCTION),\
+                           ('.!a16', '', CONTROL)),\
+                   '.xy8': (('sep.#', '0x10', INSTRUCTION),\
+                           ('.!xy8', '', CONTROL)),\
+                   '.xy16': (('rep.#', '0x10', INSTRUCTION),\
+                            ('.!xy16', '', CONTROL)),\
+                   '.axy8': (('sep.#', '0x30', INSTRUCTION),\
+                            ('.!a8', '', CONTROL),\
+                            ('.!xy8', '', CONTROL)),\
+                   '.axy16': (('rep.#', '0x30', INSTRUCTION),\
+                             ('.!a16', '', CONTROL),\
+                             ('.!xy16', '', CONTROL))}
 
-    n_passes += 1
-    verbose('PASS AXY: Registered 8/16 bit switches for A, X, and Y')
+        for line in modes_source: 
 
-else:
-    axy_source = modes_source 
+            have_found = False
 
+            # Walk through every control directive for every line
+            for ins in AXY_INS:
 
-# -------------------------------------------------------------------
-# PASS SPLIT MOVES - Split up Move instructions on the 65816
+                # Because we moved labels to their own lines, we can assume that
+                # register switches are alone in the line
+                if ins in line.action:
 
-# The MVP and MVN instructions are really, really annoying because they have two
-# operands where every other instruction has one. We deal with this by splitting
-# the instructions into two lines, dealing with the operands, and then later
-# putting them back together again. We assume that the operands are separated by
-# a comma ('mvp 00,01')
+                    for e in AXY_INS[ins]:
+                        nl = CodeLine(INDENT+line.action, line.ln, 1)
+                        nl.action = e[0]
+                        nl.parameters = e[1]
+                        nl.type = e[2]
+                        nl.status = MODIFIED
 
-move_source = []
+                        axy_source.append(nl)
+                        have_found = True
 
-if MPU == '65816':
+            if not have_found:
+                axy_source.append(line)
 
-    for line in axy_source: 
+        n_passes += 1
+        verbose('PASS AXY: Registered 8/16 bit switches for A, X, and Y')
 
-        if line.action != 'mvp' and line.action != 'mvn': 
-            move_source.append(line)
-            continue 
+    else:
+        axy_source = modes_source 
 
-        # Catch malformed move instructions
-        try:
-            l_bank, r_bank = line.parameters.split(',')
-        except ValueError:
-            fatal(line, f'Malformed "{line.action}" instruction ("{line.parameters}")')
 
-        line.parameters = l_bank
-        line.status = MODIFIED
-        move_source.append(line)
+    # -------------------------------------------------------------------
+    # PASS SPLIT MOVES - Split up Move instructions on the 65816
 
-        nl = CodeLine(INDENT+INDENT+'(dummy)', line.ln, 1)
-        nl.parameters = r_bank
-        nl.status = MODIFIED
-        nl.type = CONTROL
-        move_source.append(nl)
+    # The MVP and MVN instructions are really, really annoying because they have two
+    # operands where every other instruction has one. We deal with this by splitting
+    # the instructions into two lines, dealing with the operands, and then later
+    # putting them back together again. We assume that the operands are separated by
+    # a comma ('mvp 00,01')
 
-    n_passes += 1
-    verbose('PASS SPLIT MOVES: Split mvn/mvp instructions on the 65816')
+    move_source = []
 
-else:
-    move_source = axy_source
+    if MPU == '65816':
 
+        for line in axy_source: 
 
-# -------------------------------------------------------------------
-# PASS MACROS: Define macros
-#
-# REQUIRES all labels to be in their own lines
+            if line.action != 'mvp' and line.action != 'mvn': 
+                move_source.append(line)
+                continue 
 
-macros = {}
-macro_name = ''
-are_defining = False
+            # Catch malformed move instructions
+            try:
+                l_bank, r_bank = line.parameters.split(',')
+            except ValueError:
+                fatal(line, f'Malformed "{line.action}" instruction ("{line.parameters}")')
 
-for line in move_source: 
+            line.parameters = l_bank
+            line.status = MODIFIED
+            move_source.append(line)
 
-    if not are_defining:
+            nl = CodeLine(INDENT+INDENT+'(dummy)', line.ln, 1)
+            nl.parameters = r_bank
+            nl.status = MODIFIED
+            nl.type = CONTROL
+            move_source.append(nl)
+
+        n_passes += 1
+        verbose('PASS SPLIT MOVES: Split mvn/mvp instructions on the 65816')
 
-        # This line might not have anything to do with macros
-        if line.action != '.macro':
-            continue 
-        # If this is the start of a macro, create a line in the macro dictionary
-        else:
-            macro_name = line.parameters.strip() 
-            macros[macro_name] = []
-            are_defining = True
-            verbose(f'- Found macro "{macro_name}" in line {line.ln}')
-            line.status = DONE
     else:
+        move_source = axy_source
 
-        # Currently, we don't allow nesting
-        if line.action == '.macro':
-            fatal(line, f'Illegal Attempt to nest macro "{line.parameters}"')
 
-        # Remember this line so we can invoke it later
-        if line.action != ".endmacro":
+    # -------------------------------------------------------------------
+    # PASS MACROS: Define macros
+    #
+    # REQUIRES all labels to be in their own lines
 
-            # We need to create a copy of the line so it isn't just a reference
-            # For now, we use the line numbers of the macro definition. Later,
-            # the invokation will overwrite them
-            ml = copy.deepcopy(line) 
-            ml.status = MODIFIED
-            ml.sec_ln = 1
-            macros[macro_name].append(ml)
+    macros = {}
+    macro_name = ''
+    are_defining = False
 
-            line.status = DONE
-            
-        # We're done, so enough of this 
+    for line in move_source: 
+
+        if not are_defining:
+
+            # This line might not have anything to do with macros
+            if line.action != '.macro':
+                continue 
+            # If this is the start of a macro, create a line in the macro dictionary
+            else:
+                macro_name = line.parameters.strip() 
+                macros[macro_name] = []
+                are_defining = True
+                verbose(f'- Found macro "{macro_name}" in line {line.ln}')
+                line.status = DONE
         else:
-            are_defining = False
-            line.status = DONE
-            continue
 
-n_passes += 1
-verbose(f'STEP MACROS: Defined {len(macros)} macros')
+            # Currently, we don't allow nesting
+            if line.action == '.macro':
+                fatal(line, f'Illegal Attempt to nest macro "{line.parameters}"')
 
-# TODO pretty format this
-for m in macros.keys():
-    verbose(f'Macro {m}:')
+            # Remember this line so we can invoke it later
+            if line.action != ".endmacro":
 
-    for ml in macros[m]:
-        verbose('- {0:04}:{1:03} | {2} {3} | {4:11}|{5:11}|{6:11} {7}||'\
-                .format(ml.ln, ml.sec_ln, ml.status, ml.type, ml.action,\
-                ml.parameters, ml.il_comment, ml.raw))
+                # We need to create a copy of the line so it isn't just a reference
+                # For now, we use the line numbers of the macro definition. Later,
+                # the invokation will overwrite them
+                ml = copy.deepcopy(line) 
+                ml.status = MODIFIED
+                ml.sec_ln = 1
+                macros[macro_name].append(ml)
 
+                line.status = DONE
 
-# -------------------------------------------------------------------
-# PASS INVOKE: Insert macro definitions
-# 
-# REQUIRES macros to have been defined
+            # We're done, so enough of this 
+            else:
+                are_defining = False
+                line.status = DONE
+                continue
 
-macro_source = []
-pre_invok_len = len(move_source)
+    n_passes += 1
+    verbose(f'STEP MACROS: Defined {len(macros)} macros')
 
-for line in move_source:
+    # TODO pretty format this
+    for m in macros.keys():
+        verbose(f'Macro {m}:')
 
-    if line.action != '.invoke':
-        macro_source.append(line)
-        continue
+        for ml in macros[m]:
+            verbose('- {0:04}:{1:03} | {2} {3} | {4:11}|{5:11}|{6:11} {7}||'\
+                    .format(ml.ln, ml.sec_ln, ml.status, ml.type, ml.action,\
+                    ml.parameters, ml.il_comment, ml.raw))
 
-    # Name of macro to invoke must be second word in line
-    try:
-        m = macros[line.parameters.strip()]
-    except KeyError:
-        fatal(line, f'Attempt to invoke non-existing macro "{line.action}"')
 
-    for ml in m:
-        macro_source.append(ml)
-        ml.status = MODIFIED
-        ml.ln = line.ln
-        ml.sec_ln = 1   
-        ml.raw = f'; Invoked from macro "{line.action}" in line {line.ln}'
+    # -------------------------------------------------------------------
+    # PASS INVOKE: Insert macro definitions
+    # 
+    # REQUIRES macros to have been defined
 
-    n_invocations += 1
-    verbose(f'- Expanding macro "{line.parameters}" into line {line.ln}')
+    macro_source = []
+    pre_invok_len = len(move_source)
 
-post_invok_len = len(macro_source)
-n_passes += 1
+    for line in move_source:
 
-# We give the "net" number of lines added because we also remove the invocation
-# line itself
-verbose('PASS INVOKE: {0} macro expansion(s), net {1} line(s) added'.\
-        format(n_invocations, post_invok_len - pre_invok_len))
+        if line.action != '.invoke':
+            macro_source.append(line)
+            continue
 
+        # Name of macro to invoke must be second word in line
+        try:
+            m = macros[line.parameters.strip()]
+        except KeyError:
+            fatal(line, f'Attempt to invoke non-existing macro "{line.action}"')
 
-# -------------------------------------------------------------------
-# PASS RENUMBER SECONDARY LINE NUMBERS
-# 
-# REQUIRES all includes to be finished
-# REQUIRES all macros to be expanded 
+        for ml in m:
+            macro_source.append(ml)
+            ml.status = MODIFIED
+            ml.ln = line.ln
+            ml.sec_ln = 1   
+            ml.raw = f'; Invoked from macro "{line.action}" in line {line.ln}'
 
-# Different combinations of macros and includes can lead to strange secondary
-# line numbers. Instead of trying to figure them out in the previous steps, we
-# renumber them here before. This count starts with zero
+        n_invocations += 1
+        verbose(f'- Expanding macro "{line.parameters}" into line {line.ln}')
 
-prev_ln = 0
-sec_ln_count = 0 
+    post_invok_len = len(macro_source)
+    n_passes += 1
 
-for line in macro_source:
-    
-    if line.ln == prev_ln: 
-        sec_ln_count += 1 
-        line.sec_ln = sec_ln_count
-    else: 
-        line.sec_ln = 0 
-        sec_ln_count = 0    # TODO unelegant, rewrite
+    # We give the "net" number of lines added because we also remove the invocation
+    # line itself
+    verbose('PASS INVOKE: {0} macro expansion(s), net {1} line(s) added'.\
+            format(n_invocations, post_invok_len - pre_invok_len))
 
-    prev_ln = line.ln
 
-n_passes += 1
-verbose('PASS RENAME SECONDARY LINES: Secondary lines now numbered in sequence.')
+    # -------------------------------------------------------------------
+    # PASS RENUMBER SECONDARY LINE NUMBERS
+    # 
+    # REQUIRES all includes to be finished
+    # REQUIRES all macros to be expanded 
+
+    # Different combinations of macros and includes can lead to strange secondary
+    # line numbers. Instead of trying to figure them out in the previous steps, we
+    # renumber them here before. This count starts with zero
+
+    prev_ln = 0
+    sec_ln_count = 0 
+
+    for line in macro_source:
+
+        if line.ln == prev_ln: 
+            sec_ln_count += 1 
+            line.sec_ln = sec_ln_count
+        else: 
+            line.sec_ln = 0 
+            sec_ln_count = 0    # TODO unelegant, rewrite
+
+        prev_ln = line.ln
+
+    n_passes += 1
+    verbose('PASS RENAME SECONDARY LINES: Secondary lines now numbered in sequence.')
 
-ir_source = macro_source
+    ir_source = macro_source
 
    
 # -------------------------------------------------------------------
@@ -1435,29 +2079,67 @@ verbose('STEP: Intermediate Representation (IR) created with {0} lines of code'.
 if args.ir: 
 
     with open(IR_FILE, 'w') as f:
-
-        for l in make_listing(ir_source):
-            f.write(l+'\n')
+        f.writelines(l+'\n' for l in make_listing(ir_source))
 
 n_steps += 1
 verbose(f'- IR saved to file {IR_FILE}')
 
 
+# -------------------------------------------------------------------
+# STEP SAVE SNAPSHOT: Save binary IR snapshot if requested
+#
+# REQUIRES Intermediate Representation to have been generated
+
+# This is what --from-ir reads back. Everything after this point is done again
+# when we resume, so command line definitions can be changed
+
+if args.snapshot and not args.from_ir:
+
+    snapshot = {'source': args.source, 'mpu': MPU, 'ir': ir_source,\
+            'macros': macros,\
+            'counts': (n_comment_lines, n_empty_lines, n_external_files,\
+                n_invocations, n_passes, n_steps, n_warnings)}
+
+    with open(IR_SNAPSHOT_FILE, 'wb') as f:
+        f.write(IR_SNAPSHOT_MAGIC+bytes([IR_SNAPSHOT_VERSION]))
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    n_steps += 1
+    verbose(f'STEP SAVE SNAPSHOT: Saved binary IR snapshot as {IR_SNAPSHOT_FILE}')
+
+
+# -------------------------------------------------------------------
+# STEP INDEX: Find out which lines use which words
+
+# We replace symbols twice, once we know the simple assignments and again once
+# we know the labels. Most lines don't use any symbols, so instead of going
+# through all of them each time, we remember which line uses which word once
+# and then only look at those lines. We do this here instead of in the front
+# end so it works the same when we resume from a snapshot
+
+for line in ir_source:
+
+    if line.status != DONE:
+        index_symbols(line)
+
+n_steps += 1
+verbose(f'STEP INDEX: Indexed {len(symbol_uses)} different word(s) in parameters')
+
+
 # -------------------------------------------------------------------
 # STEP ORIGIN: Find .ORIGIN directive
 
 # Standard requires origin to be the highest line. Since we've alread taken care
-# of the .MPU, this should be the first non-completed line. 
+# of the .MPU, this should be the first non-completed line. Any further
+# '.origin' directives are handled in STEP SECTIONS
 
 for line in ir_source:
 
     if line.status == DONE:
         continue
 
-    # .ORIGIN should be first line, or else we're in trouble. Note that in
-    # theory, it could be uppercase, so we go the extra mile and convert it
-    s = line.action.strip().lower() 
-    if s != '.origin':
+    # .ORIGIN should be first line, or else we're in trouble
+    if line.action != '.origin':
         fatal(line, '".origin" directive missing or too late, found "{0}" instead'.\
                 format(line.action))
 
@@ -1482,9 +2164,7 @@ verbose('STEP ORIGIN: Found ."origin" directive, starting code at {0:06x}'.\
 # End directive must be in the last line
 
 s = ir_source[len(ir_source)-1]
-sa = s.action.strip().lower() 
-
-if sa != '.end':
+if s.action != '.end':
     fatal(s, f"Can't find '.end' directive in last line, found '{s.raw}'")
 
 s.status = DONE
@@ -1493,6 +2173,119 @@ n_steps += 1
 verbose('STEP END: Found ".end" directive in last line, very good')
 
 
+# -------------------------------------------------------------------
+# STEP SECTIONS: Find out which section each line belongs to
+
+# '.section rodata 0xc000' starts a section with that name at the address, and
+# every line after it belongs to that section until the next '.section'
+# directive. '.section rodata' without an address goes back to a section we
+# already know, so each kind of content can be collected in one place, no matter
+# where it is in the source. The default section "code" starts at the origin.
+# Sections with 'noload' at the end, for example for variables in RAM, are
+# assigned addresses but not saved. Addresses given with --section on the
+# command line win over those in the source. Like '.origin', the address must
+# be a number
+
+# Every '.origin' after the first one starts a new block of code at its
+# address, so we don't have to fill the space between them with '.advance'.
+# These are sections as well, named after their address, such as
+# "origin_00fffa" for the vectors
+
+section = SECTION_DEFAULT
+sections[SECTION_DEFAULT] = LC0
+
+for line in ir_source:
+
+    if line.action == '.origin' and line.status != DONE:
+        f_num, r = convert_number(line.parameters)
+
+        if not f_num:
+            fatal(line, f'".origin" directive gives "{line.parameters}", not number as required')
+
+        section = f'{SECTION_ORIGIN}{r:06x}'
+
+        # We don't know how long the blocks are yet, so PASS BINARY checks if
+        # they overlap. Here we can only catch blocks that start at the same place
+        if r in sections.values():
+            fatal(line, f'".origin" at {r:06x} starts at the same address as '\
+                    'earlier code')
+
+        sections[section] = r
+        origin_lines[section] = line
+        line.status = DONE
+
+    if line.action == '.section':
+        w = line.parameters.split()
+
+        if not w or len(w) > 3 or (len(w) == 3 and w[2] != SECTION_NOLOAD):
+            fatal(line, '".section" needs a name, an address and "noload" if not saved')
+
+        section = w[0]
+
+        if section == SECTION_DEFAULT and len(w) > 1:
+            fatal(line, f'Section "{section}" starts at the origin, no address allowed')
+
+        if len(w) > 1:
+            f_num, r = convert_number(w[1])
+
+            if not f_num:
+                fatal(line, f'".section" gives "{w[1]}", not number as required')
+
+            if section in sections and sections[section] != r:
+                fatal(line, f'Section "{section}" already starts at {sections[section]:06x}')
+
+            sections[section] = r
+
+            if len(w) == 3:
+                noload_sections.add(section)
+
+        elif section not in sections:
+            fatal(line, f'No address given for new section "{section}"')
+
+        line.type = DIRECTIVE
+        line.status = DONE
+
+    line.section = section
+
+if args.section:
+
+    for name, r in args.section:
+
+        if name not in sections or name == SECTION_DEFAULT:
+            parser.error(f'cannot place section "{name}" from the command line')
+
+        sections[name] = r
+        verbose(f'- Placed section "{name}" at {r:06x} from command line')
+
+if len(sections) > 1 and args.object:
+    print('FATAL: Sections cannot be used with --object, aborting.')
+    sys.exit(1)
+
+n_steps += 1
+verbose(f'STEP SECTIONS: Found {len(sections)} section(s)')
+
+
+# -------------------------------------------------------------------
+# STEP DEFINE: Add symbols defined on the command line
+
+# These are treated as if they were assigned with '.equ' before the first line
+# of the source code
+
+if args.define:
+
+    for name, value in args.define:
+
+        # Same rules as vet_newsymbol(), but there is no line to blame
+        if name in DIRECTIVES or name in mnemonics or name in symbol_table:
+            parser.error(f'cannot define "{name}" on the command line')
+
+        set_symbol(name, value)
+        verbose(f'- Defined symbol "{name}" as {value} from command line')
+
+    n_steps += 1
+    verbose(f'STEP DEFINE: Added {len(args.define)} symbol(s) from command line')
+
+
 # -------------------------------------------------------------------
 # PASS SIMPLE ASSIGN: Handle first round of basic assigments
 
@@ -1500,40 +2293,25 @@ verbose('STEP END: Found ".end" directive in last line, very good')
 # a variable ('.equ jack 1') or a symbol we already know ('.equ jill jack')
 # without modifiers or math. We can't do full assignments until we've dealt with
 # labels, but we can do this now to cut down on the number of lines we have to
-# go through every time. 
-
-for line in ir_source:
-
-    if (line.status == DONE) or (line.action != ASSIGNMENT):
-        continue 
-
-    w = line.parameters.split()
+# go through every time. Because we go through them in the order of their
+# dependencies, '.equ jill jack' works even if jack is assigned later
 
-    # We need exactly two parameters, the new symbol and the number or old
-    # symbol it is to be assigned to
-    if len(w) != 2:
-        continue 
-
-    vet_newsymbol(w[0])
+for symbol, line, term in assignment_order(ir_source, simple=True):
 
     # In '.equ frog abc', 'abc' can either be a symbol or a number. We want it
     # to be a symbol by default, so we check the symbol table first
     try:
-        r = symbol_table[w[1]]
+        r = symbol_table[term]
     except KeyError:
-        pass
-    else:
-        symbol_table[w[0].lower()] = r
-        line.status = DONE
-        continue
+        f_num, r = convert_number(term)
 
-    f_num, r = convert_number(w[1])
+        # If it's not a number either, we'll have to wait until we've figured
+        # out more stuff
+        if not f_num:
+            continue
 
-    # If it's a number, add it to the symbol table, otherwise we'll have to wait
-    # until we've figured out more stuff
-    if f_num:
-        symbol_table[w[0].lower()] = r
-        line.status = DONE
+    set_symbol(symbol, r)
+    line.status = DONE
 
 n_passes += 1
 verbose(f'PASS SIMPLE ASSIGN: Assigned {len(symbol_table)} new symbol(s) to symbol table')
@@ -1547,9 +2325,58 @@ if args.verbose:
 # PASS REPLACE (1): Handle known assignments
 
 # Note this does not touch symbols in .BYTE etc directives
-replace_symbols(ir_source)
+replace_symbols()
+
+n_passes += 1
+
+
+# -------------------------------------------------------------------
+# PASS MATHDEF: Add words defined by the user to the math engine
+
+# '.mathdef .sq ( n -- n ) .dup *' defines a new word '.sq' that can be used in
+# math terms like any other, so '[ 3 .sq ]' is 9. The words are compiled once
+# here so later terms don't have to parse them again. The stack comment in
+# parentheses is optional, but if it is there, the math engine checks that the
+# word really takes and leaves that many numbers. Because the comment marker
+# ends the line, there is no closing semicolon as in Forth. Symbols in the
+# definition must be known at this point, so no labels
+
+n_mathdefs = 0
+
+for line in ir_source:
+
+    if (line.status == DONE) or (line.action != '.mathdef'):
+        continue
+
+    w = line.parameters.split(None, 1)
+
+    if len(w) != 2:
+        fatal(line, '".mathdef" needs a name and a definition')
+
+    name, body = w[0], w[1]
+    effect = None
+
+    # The stack comment lists the names of the numbers the word takes and
+    # leaves, we only care how many there are
+    if body.split()[0] == '(':
+
+        try:
+            comment, body = body.split('(', 1)[1].split(')', 1)
+            takes, leaves = comment.split('--')
+        except ValueError:
+            fatal(line, f'Cannot read stack comment of "{name}"')
+
+        effect = (len(takes.split()), len(leaves.split()))
+
+    if not define_word(name, body, effect):
+        fatal(line, f'Math engine failed on definition of "{name}"')
+
+    verbose(f'- Defined word "{name}" for math terms in line {line.ln}')
+    line.status = DONE
+    n_mathdefs += 1
 
 n_passes += 1
+verbose(f'PASS MATHDEF: Added {n_mathdefs} new word(s) to math engine')
 
  
 # -------------------------------------------------------------------
@@ -1694,12 +2521,264 @@ if MPU == '65816':
 
  
 # -------------------------------------------------------------------
-# PASS LABELS - Construct symbol table by finding all labels
+# PASS PRUNE SWITCHES: Remove register size switches that change nothing
+#
+# REQUIRES register size directives turned into rep/sep and asserts
 
-# This is the equivalent of the traditional "Pass 1" in normal two-pass
-# assemblers. 
+# Directives such as '.a8' always produce a 'sep.#' or 'rep.#' instruction,
+# even when we know the register already has that size. If the user asks us
+# to, we remove these instructions or drop the bits for the register that
+# doesn't change. We only touch the instructions we created ourselves. Labels
+# are places where we could arrive from anywhere, so we forget what we know
+# there, as we do after instructions that change the sizes in ways we can't
+# follow. Note that the asserts stay, so the sizes of the lines don't change
 
-def lc_offset(register_width):
+# These change the register sizes behind our back. 'xce' forces them to eight
+# bit when it switches to emulated mode, and they stay that way after it
+# switches back. 'brk', 'cop' and 'wdm' run code we don't know
+UNKNOWN_WIDTH_INS = ['plp', 'rti', 'jsr', 'jsr.l', 'jsr.xi', 'rep.#', 'sep.#',\
+        'xce', 'brk', 'cop', 'wdm']
+
+# Bits in the operand of rep.# and sep.# for the size of A and XY
+WIDTH_BITS = {'a': 0x20, 'xy': 0x10}
+
+if MPU == '65816' and args.prune_switches:
+
+    n_pruned = 0
+
+    # None means we don't know
+    known_width = {'a': 8, 'xy': 8}
+
+    for line in ir_source:
+
+        if line.type == LABEL:
+            known_width = {'a': None, 'xy': None}
+            continue
+
+        if line.status == DONE and line.type != CONTROL:
+            continue
+
+        if line.action == '.!emulated':
+            known_width = {'a': 8, 'xy': 8}
+            continue
+
+        if line.action not in UNKNOWN_WIDTH_INS:
+            continue
+
+        # Switches we made ourselves have the directive as their raw string
+        directive = line.raw.strip()
+
+        if line.action not in ['rep.#', 'sep.#'] or\
+                directive not in ['.a8', '.a16', '.xy8', '.xy16', '.axy8', '.axy16']:
+            known_width = {'a': None, 'xy': None}
+            continue
+
+        if directive.endswith('16'):
+            new_width = 16
+        else:
+            new_width = 8
+
+        _, old_bits = convert_number(line.parameters)
+        bits = 0
+
+        for register, bit in WIDTH_BITS.items():
+
+            if old_bits & bit:
+
+                if known_width[register] != new_width:
+                    bits |= bit
+
+                known_width[register] = new_width
+
+        if bits == old_bits:
+            continue
+
+        n_pruned += 1
+
+        if bits == 0:
+            msg = f'"{line.action} {line.parameters}" for "{directive}" removed'
+            line.raw = f'{INDENT}{COMMENT_MARKER} (pruned) {line.action} {line.parameters}'
+            line.type = COMMENT
+            line.status = DONE
+        else:
+            msg = f'"{line.action} {line.parameters}" for "{directive}" '\
+                    f'reduced to "{line.action} 0x{bits:02x}"'
+            line.parameters = f'0x{bits:02x}'
+
+        verbose(f'- Line {line.ln}: {msg}')
+        optimizations.append((line.ln, line.sec_ln, msg))
+
+    n_passes += 1
+    verbose(f'PASS PRUNE SWITCHES: Removed or reduced {n_pruned} register switch(es)')
+
+
+# -------------------------------------------------------------------
+# PASS DEAD CODE: Find and remove routines that can't be reached if requested
+
+# Libraries of routines tend to be included as a whole, so the code ends up with
+# routines nobody ever calls. Here, a routine is everything from a label to the
+# next label. Code that is not part of a routine - before the first label or
+# after an '.advance', '.section' or '.origin', which is where the vectors
+# usually are - is always kept, as is the first routine, because that is
+# where the code starts at the origin, the labels given with '--entry', and
+# routines with data that holds the address of a label, such as the table of
+# the reset, NMI and IRQ vectors. From there, we follow every use of a symbol
+# in instructions and data to the routine that defines it, and from a routine
+# to the next one if its last instruction isn't a jump or return. Whatever we
+# don't reach this way is dead. This is done
+# before PASS LABELS so removing code doesn't move anything that is already
+# assembled. We only remove the lines that create bytes, so labels,
+# assignments and other directives stay where they are.
+
+# Instructions that never continue with the next line
+STOP_INS = ['rts', 'rts.l', 'rti', 'jmp', 'jmp.l', 'jmp.i', 'jmp.xi', 'jmp.il',\
+        'bra', 'bra.l', 'stp']
+
+# Directives that create bytes and are removed with dead routines
+DEAD_DIRECTIVES = DATA_DIRECTIVES + ['.table', '.skip', '.align']
+
+if args.report_dead or args.strip_dead:
+
+    # Each routine is a list of the label line and its other lines. The lines
+    # that are not part of a routine are collected under None
+    routines = {None: [None]}
+    routine_order = []
+    current = None
+
+    for line in ir_source:
+
+        if line.type == LABEL and line.action != LOCAL_LABEL:
+            current = line.action[:-1]
+            routines[current] = [line]
+            routine_order.append(current)
+            continue
+
+        if line.action in ['.advance', '.section', '.origin']:
+            current = None
+
+        routines[current].append(line)
+
+    # Symbols defined by .equ have their own entry so they only keep routines
+    # alive if they are used themselves
+    owners = {name: name for name in routines if name}
+    uses = {name: set() for name in routines}
+    data_roots = []
+
+    for name, lines in routines.items():
+
+        for line in lines[1:]:
+
+            if line.status == DONE or line.type in [COMMENT, WHITESPACE]:
+                continue
+
+            words = set(re.split(r'[\s,]+', line.parameters))
+
+            # Other modules might use what we export
+            if line.action == '.export':
+                uses[None].update(words)
+                continue
+
+            if line.action == ASSIGNMENT:
+                symbol = line.parameters.split()[0]
+                owners[symbol] = symbol
+                uses[symbol] = words
+                continue
+
+            if line.action == '.save':
+                owners[line.parameters.split()[0]] = name
+
+            # Tables of addresses such as the vectors are usually not used by
+            # name, so if they point to a label, we keep them
+            if line.action in DATA_DIRECTIVES and\
+                    any(w in routines for w in words):
+                data_roots.append(name)
+
+            uses[name].update(words)
+
+    # Routines fall through to the next one unless their last instruction is a
+    # jump or return. Directives that follow it, such as the register checks
+    # of '.a16' or an '.equ', don't change this. Routines that are only data
+    # don't fall through
+    for name, next_name in zip(routine_order, routine_order[1:]):
+        last = [l for l in routines[name][1:] if l.type == INSTRUCTION]
+
+        if last and last[-1].action not in STOP_INS:
+            uses[name].add(next_name)
+
+    # Start with the code that isn't part of a routine, the first routine, the
+    # tables of addresses and the entry points
+    todo = [None] + routine_order[:1] + data_roots
+
+    for entry in args.entry or []:
+
+        if entry.lower() not in routines:
+            print(f'FATAL: Label "{entry}" for --entry not found, aborting.')
+            sys.exit(1)
+
+        todo.append(entry.lower())
+
+    alive = set(todo)
+
+    while todo:
+
+        for word in uses[todo.pop()]:
+
+            if word in owners and owners[word] not in alive:
+                alive.add(owners[word])
+                todo.append(owners[word])
+
+    for name in routine_order:
+
+        if name in alive:
+            continue
+
+        n_dead += 1
+        label = routines[name][0]
+        n_lines = len([l for l in routines[name] if l.type not in [COMMENT, WHITESPACE]])
+        msg = f'Routine "{label.action[:-1]}" can\'t be reached ({n_lines} line(s))'
+
+        if args.report_dead:
+            warning(f'{msg} in line {label.ln}')
+
+        if not args.strip_dead:
+            continue
+
+        verbose(f'- Line {label.ln}: {msg}, removed')
+        optimizations.append((label.ln, label.sec_ln, f'{msg}, removed'))
+
+        for line in routines[name]:
+
+            if line.type != INSTRUCTION and line.action not in DEAD_DIRECTIVES:
+                continue
+
+            line.raw = f'{INDENT}{COMMENT_MARKER} (dead) {line.action} {line.parameters}'
+            line.type = COMMENT
+            line.status = DONE
+
+    n_passes += 1
+    verbose(f'PASS DEAD CODE: Found {n_dead} routine(s) that can\'t be reached')
+
+
+# -------------------------------------------------------------------
+# PASS LAYOUT: Relax branches and use zero page forms if requested
+
+# Short branches only reach -128 to +127 bytes. If the user asks us to, we
+# replace the ones that are too far by an inverted branch across a jump (6502,
+# 65c02) or long branch (65816), so 'bne far' becomes 'beq [ .* 5 + ]' followed
+# by 'jmp far'. Also, because every mnemonic maps to one opcode, 'lda 0042' is
+# always assembled as absolute. If the user asks us to, we replace these with
+# the zero page ('lda.z') or direct page ('lda.d') forms where they exist. On
+# the 65816, this assumes that the Direct Page register is zero, and that the
+# Data Bank Register is zero as well, because absolute addresses are in the
+# data bank but the direct page is always in bank zero. If the code changes the
+# Data Bank Register, we don't touch anything.
+
+# For all of this, we need to know where everything is going to be before the
+# real work is done in PASS LABELS, so we do a provisional layout with the same
+# sizes. Because every change moves the code after it, we repeat this until
+# nothing changes.
+
+def lc_offset(register_width):
     """For the 65816, convert the register width of A or XY to the byte
     offset that must be added during assembly for the immediate
     instructions.
@@ -1707,18 +2786,545 @@ def lc_offset(register_width):
     return (register_width-8)//8
 
 
-BRANCHES = ['bra', 'beq', 'bne', 'bpl', 'bmi', 'bcc', 'bcs', 'bvc', 'bvs',\
-           'bra.l', 'phe.r']
-
 # These are only used for 65816. The offsets are used to calculate if an extra
 # byte is needed for immediate forms such as lda.# with the 65816
 A_IMM = ['adc.#', 'and.#', 'bit.#', 'cmp.#', 'eor.#', 'lda.#', 'ora.#', 'sbc.#']
 XY_IMM = ['cpx.#', 'cpy.#', 'ldx.#', 'ldy.#']
 
+# Maximal number of provisional layouts before we give up. Relaxing branches
+# makes the code longer, using the zero page makes it shorter, so in theory
+# they could keep undoing each other
+MAX_LAYOUTS = 20
+
+# Zero page (6502, 65c02) and direct page (65816) forms of the absolute modes
+ZERO_PAGE_FORMS = {
+    '6502': {'': '.z', '.x': '.zx', '.y': '.zy'},\
+    '65c02': {'': '.z', '.x': '.zx', '.y': '.zy'},\
+    '65816': {'': '.d', '.x': '.dx', '.y': '.dy'}}
+
+# 65816 instructions that change the Data Bank Register
+DBR_INS = ['plb', 'mvn', 'mvp']
+
+# Conditional branches and the branches with the opposite condition
+INVERSE_BRANCHES = {'beq': 'bne', 'bne': 'beq', 'bpl': 'bmi', 'bmi': 'bpl',\
+        'bcc': 'bcs', 'bcs': 'bcc', 'bvc': 'bvs', 'bvs': 'bvc'}
+
+
+def instruction_size(line):
+    """Given a line object with an instruction, return the number of bytes it
+    will be assembled to, including the extra byte for 65816 immediate
+    instructions with 16 bit registers.
+    """
+    size = opcode_table[mnemonics[line.action]][2]
+
+    if MPU == '65816':
+
+        if line.action in A_IMM:
+            size += lc_offset(line.a_width)
+        elif line.action in XY_IMM:
+            size += lc_offset(line.xy_width)
+
+    return size
+
+
+def provisional_value(s):
+    """Given a string with a term, return its value if it is a number or known
+    symbol, else None. Unlike convert_term, this does not abort because we
+    might just not know enough yet.
+    """
+    try:
+        return symbol_table[s.strip()]
+    except KeyError:
+        pass
+
+    f_num, r = convert_number(s.strip())
+
+    if f_num:
+        return r
+
+
+def provisional_layout(src):
+    """Given a list of line objects, return a dictionary of the addresses of
+    the lines and the labels we would get with the current code, and a list of
+    the anonymous labels as tuples of line number and address. Return None
+    for the dictionary if there is a line we can't figure out the size of.
+    """
+    addresses = {}
+    anons = []
+    lc = LC0
+    section = SECTION_DEFAULT
+    section_lcs = {}
+
+    for line in src:
+
+        if line.section != section:
+            section_lcs[section] = lc
+            section = line.section
+            lc = section_lcs.get(section, sections[section])
+
+        addresses[id(line)] = lc
+
+        if line.status == DONE:
+            continue
+
+        if line.action in mnemonics:
+            lc += instruction_size(line)
+
+        elif line.type == LABEL:
+
+            if line.action == LOCAL_LABEL:
+                anons.append((line.ln, lc))
+            else:
+                addresses[line.action[:-1]] = lc
+
+        elif line.action in DATA_DIRECTIVES:
+            lc += len(line.parameters.strip().rstrip(',').split(','))*\
+                    {'.byte': 1, '.word': 2, '.long': 3}[line.action]
+
+        elif line.action == '.table':
+            w = line.parameters.split()
+            start = provisional_value(w[1])
+            end = provisional_value(w[2])
+
+            if start is None or end is None:
+                return None, anons
+
+            lc += (end-start+1) * TABLE_WIDTHS.get(w[0], 1)
+
+        elif line.action in ['.skip', '.save', '.advance']:
+            r = provisional_value(line.parameters.split()[-1])
+
+            if r is None:
+                return None, anons
+
+            if line.action == '.save':
+                addresses[line.parameters.split()[0]] = lc
+
+            if line.action == '.advance':
+                lc = r
+            else:
+                lc += r
+
+        elif line.action == '.align':
+            r = provisional_value(line.parameters)
+
+            if not r:
+                return None, anons
+
+            lc += -lc % r
+
+    return addresses, anons
+
+
+def zero_page_form(action):
+    """Given the mnemonic of an instruction, return the mnemonic of its zero
+    page or direct page form if this is an absolute mode that has one, else
+    None.
+    """
+    base, dot, suffix = action.partition('.')
+
+    try:
+        zp_action = base + ZERO_PAGE_FORMS[MPU][dot+suffix]
+    except KeyError:
+        return None
+
+    if zp_action in mnemonics:
+        return zp_action
+
+
+def branch_target(line, addresses, anons):
+    """Given a line object with a branch and the results of the provisional
+    layout, return the target address, or None if we can't tell yet.
+    """
+    p = line.parameters.strip()
+
+    if p == '+':
+        return next((a for ln, a in anons if ln > line.ln), None)
+
+    if p == '-':
+        return next((a for ln, a in reversed(anons) if ln < line.ln), None)
+
+    try:
+        return addresses[p]
+    except KeyError:
+        return provisional_value(p)
+
+
+if args.relax_branches or args.zero_page:
+
+    n_layouts = 0
+    use_zero_page = args.zero_page
+
+    if use_zero_page and MPU == '65816':
+        dbr_line = next((l for l in ir_source\
+                if l.status != DONE and l.action in DBR_INS), None)
+
+        if dbr_line:
+            warning(f'"{dbr_line.action}" in line {dbr_line.ln} changes the '\
+                    'Data Bank Register, not using direct page forms')
+            use_zero_page = False
+
+    # Keep track of the lines we moved to the zero page and what they were
+    zero_page_lines = {}
+
+    while True:
+
+        n_layouts += 1
+        addresses, anons = provisional_layout(ir_source)
+
+        if addresses is None:
+            warning("Can't do provisional layout, no branches relaxed and no zero page used")
+            break
+
+        if n_layouts > MAX_LAYOUTS:
+            warning(f'Layout not stable after {MAX_LAYOUTS} tries, giving up')
+            break
+
+        layout_source = []
+        n_changes = 0
+
+        for line in ir_source:
+
+            layout_source.append(line)
+
+            if line.status == DONE or line.type != INSTRUCTION:
+                continue
+
+            # --- SUBSTEP ZERO PAGE: Use the shorter forms where possible ---
+
+            if use_zero_page:
+
+                r = provisional_value(line.parameters)
+
+                if r is None:
+                    r = addresses.get(line.parameters.strip())
+
+                # If a line we moved to the zero page now has an operand that
+                # doesn't fit any more, we have to go back to the absolute form
+                if id(line) in zero_page_lines and (r is None or r > 0xff):
+                    line.action, entry = zero_page_lines.pop(id(line))
+                    optimizations.remove(entry)
+                    n_changes += 1
+                    continue
+
+                zp_action = zero_page_form(line.action)
+
+                if zp_action and r is not None and r <= 0xff:
+                    msg = f'"{line.action}" replaced by "{zp_action}"'
+                    verbose(f'- Line {line.ln}: {msg}')
+                    entry = (line.ln, line.sec_ln, msg)
+                    optimizations.append(entry)
+                    zero_page_lines[id(line)] = (line.action, entry)
+                    line.action = zp_action
+                    line.status = MODIFIED
+                    n_changes += 1
+                    continue
+
+            # --- SUBSTEP RELAX: Replace branches that are out of range ---
+
+            if not args.relax_branches or\
+                    (line.action not in INVERSE_BRANCHES and line.action != 'bra'):
+                continue
+
+            target = branch_target(line, addresses, anons)
+
+            if target is None:
+                continue
+
+            offset = target - addresses[id(line)] - 2
+
+            if -128 <= offset <= 127:
+                continue
+
+            if MPU == '65816':
+                long_jump = 'bra.l'
+            else:
+                long_jump = 'jmp'
+
+            msg = f'"{line.action}" out of range ({offset} bytes), relaxed'
+            verbose(f'- Line {line.ln}: {msg}')
+            optimizations.append((line.ln, line.sec_ln, msg))
+            n_relaxed += 1
+            n_changes += 1
+
+            # An unconditional branch just becomes the long form
+            if line.action == 'bra':
+                line.action = long_jump
+                line.status = MODIFIED
+                continue
+
+            jump_line = CodeLine(line.raw, line.ln, line.sec_ln+1)
+            jump_line.action = long_jump
+            jump_line.parameters = line.parameters
+            jump_line.type = INSTRUCTION
+            jump_line.status = MODIFIED
+            jump_line.mode = line.mode
+            jump_line.a_width = line.a_width
+            jump_line.xy_width = line.xy_width
+            jump_line.section = line.section
+            index_symbols(jump_line)
+            layout_source.append(jump_line)
+
+            # The inverted branch skips itself and the three bytes of the jump
+            line.action = INVERSE_BRANCHES[line.action]
+            line.parameters = f'{LEFTMATH} {CURRENT} 5 + {RIGHTMATH}'
+            line.status = MODIFIED
+
+        ir_source = layout_source
+
+        if n_changes == 0:
+            break
+
+    n_passes += 1
+    verbose(f'PASS LAYOUT: Relaxed {n_relaxed} branch(es), moved '\
+            f'{len(zero_page_lines)} instruction(s) to zero page '\
+            f'in {n_layouts} layout(s)')
+
+ 
+# -------------------------------------------------------------------
+# PASS PEEPHOLE: Remove or replace useless instructions if requested
+
+# We look at pairs of instructions that follow each other directly, with
+# nothing but comments and whitespace between them. A label or anything else
+# between them means somebody else might jump there, so we leave them alone.
+# Other rules look at one instruction at a time, no matter what comes before
+# it. We do this before PASS LABELS so we don't have to move code that is
+# already assembled, and so we can still compare operands by name. Removed
+# lines are kept as comments so they show up in the listing.
+
+# Each pair rule gets the first and second instruction and a dictionary of the
+# instruction that directly follows each instruction, by id. Each single rule
+# gets the instruction, a dictionary of the first instruction after each label,
+# and the provisional layout. If a rule changes something, it returns a list
+# of the lines it wants removed and a message for the listing, else None. To
+# add a rule, write the function and add it to PEEPHOLE_PAIR_RULES or
+# PEEPHOLE_SINGLE_RULES at the end
+
+TAIL_CALLS = {'jsr': ('rts', 'jmp'), 'jsr.l': ('rts.l', 'jmp.l')}
+STORE_LOADS = {'sta': 'lda', 'stx': 'ldx', 'sty': 'ldy'}
+# 'cli' and 'sei' are not included, because 'cli' / 'sei' lets pending
+# interrupts through and is not a mistake
+FLAG_INS = {'clc': 'c', 'sec': 'c', 'cld': 'd', 'sed': 'd', 'clv': 'v'}
+JUMPS = ['jmp', 'bra']
+
+# Instructions that set both the N and Z flag without reading them, by the
+# part of the mnemonic before the dot. 'bit.#' only sets Z and is handled
+# separately
+NZ_SETS = ['lda', 'ldx', 'ldy', 'adc', 'sbc', 'and', 'ora', 'eor', 'cmp',\
+        'cpx', 'cpy', 'bit', 'inc', 'dec', 'inx', 'iny', 'dex', 'dey', 'asl',\
+        'lsr', 'rol', 'ror', 'tax', 'tay', 'txa', 'tya', 'tsx', 'pla', 'plx',\
+        'ply', 'txy', 'tyx', 'tcd', 'tdc', 'tsc', 'xba', 'pld', 'plb']
+
+
+def flags_dead(line):
+    """Given the line object of the instruction after a load, or None,
+    return True if it overwrites the N and Z flags before anybody can read
+    them. If we don't know what comes next, the flags might be used.
+    """
+    if line is None or line.type != INSTRUCTION or line.action == 'bit.#':
+        return False
+
+    return line.action.partition('.')[0] in NZ_SETS
+
+
+def peep_tail_call(first, second, following):
+    """A subroutine jump followed by a return becomes a simple jump, and
+    the return is removed: 'jsr x' / 'rts' -> 'jmp x'
+    """
+    if first.action in TAIL_CALLS and\
+            second.action == TAIL_CALLS[first.action][0]:
+        old = first.action
+        first.action = TAIL_CALLS[first.action][1]
+        return [second], f'"{old}" and "{second.action}" replaced by "{first.action}"'
+
+
+def peep_store_load(first, second, following):
+    """A load from the address we just stored the same register to is
+    removed: 'sta x' / 'lda x' -> 'sta x'. Because the load sets the N and Z
+    flags, this is only done if the next instruction sets them again
+    """
+    base, dot, mode = first.action.partition('.')
+
+    if base in STORE_LOADS and\
+            second.action == STORE_LOADS[base]+dot+mode and\
+            second.parameters.strip() == first.parameters.strip() and\
+            flags_dead(following.get(id(second))):
+        return [second], f'"{second.action}" after "{first.action}" removed'
+
+
+def peep_flags(first, second, following):
+    """The first of two instructions that set or clear the same flag has no
+    effect and is removed: 'clc' / 'sec' -> 'sec'
+    """
+    if first.action in FLAG_INS and\
+            FLAG_INS[first.action] == FLAG_INS.get(second.action):
+        return [first], f'"{first.action}" before "{second.action}" removed'
+
+
+def peep_fold_jumps(line, entries, layout):
+    """A jump or branch to a jump or unconditional branch goes to the final
+    target directly: 'bne x' ... 'x: jmp y' -> 'bne y'. Branches are only
+    changed if the new target is in range
+    """
+    if line.action not in JUMPS and line.action not in INVERSE_BRANCHES:
+        return
+
+    try:
+        target = entries[line.parameters.strip()]
+    except KeyError:
+        return
+
+    # Anonymous labels depend on where the instruction is, so we skip them
+    p = target.parameters.strip()
+
+    if target.action not in JUMPS or p in ['+', '-'] or\
+            p == line.parameters.strip():
+        return
+
+    if line.action != 'jmp':
+        addresses, anons = layout
+
+        if addresses is None or id(line) not in addresses:
+            return
+
+        t = branch_target(target, addresses, anons)
+
+        if t is None or not -128 <= t - addresses[id(line)] - 2 <= 127:
+            return
+
+    old = line.parameters
+    line.parameters = p
+    index_symbols(line)
+    return [], f'"{line.action} {old}" now goes to "{p}"'
+
+
+PEEPHOLE_PAIR_RULES = [peep_tail_call, peep_store_load, peep_flags]
+PEEPHOLE_SINGLE_RULES = [peep_fold_jumps]
+
+
+if args.peephole:
+
+    n_peepholes = 0
+
+    def apply_peephole(line, r):
+        """Given the line a rule was applied to and the result of the rule,
+        record the change and turn the removed lines into comments
+        """
+        # We report the change in the line that was removed if there is one,
+        # because that is the one that will be missing
+        removed, msg = r
+        reported = (removed + [line])[0]
+        verbose(f'- Line {reported.ln}: {msg}')
+        optimizations.append((reported.ln, reported.sec_ln, msg))
+        line.status = MODIFIED
+
+        for rl in removed:
+            rl.raw = f'{INDENT}{COMMENT_MARKER} (peephole) {rl.action} {rl.parameters}'
+            rl.type = COMMENT
+            rl.status = DONE
+
+    for _ in range(MAX_LAYOUTS):
+
+        # Find the instructions, which instruction follows each label, and
+        # which instruction directly follows each instruction
+        instructions = []
+        pairs = []
+        entries = {}
+        following = {}
+        previous = None
+        waiting_labels = []
+
+        for line in ir_source:
+
+            if line.type in [COMMENT, WHITESPACE]:
+                continue
+
+            if line.type == LABEL:
+                waiting_labels.append(line.action[:-1])
+                previous = None
+                continue
+
+            if line.type != INSTRUCTION or line.status == DONE:
+                waiting_labels = []
+                previous = None
+                continue
+
+            for label in waiting_labels:
+                entries[label] = line
+
+            waiting_labels = []
+            instructions.append(line)
+
+            if previous:
+                pairs.append((previous, line))
+                following[id(previous)] = line
+
+            previous = line
+
+        # One layout for the whole round is enough. Rules only remove code or
+        # replace instructions with ones of the same size, so branches can
+        # only get shorter until the next round
+        layout = provisional_layout(ir_source)
+
+        n_changes = 0
+
+        for first, second in pairs:
+
+            # Lines that were removed earlier in this round are comments now
+            if first.type != INSTRUCTION or second.type != INSTRUCTION:
+                continue
+
+            for rule in PEEPHOLE_PAIR_RULES:
+                r = rule(first, second, following)
+
+                if r is not None:
+                    apply_peephole(first, r)
+                    n_changes += 1
+                    break
+
+        for line in instructions:
+
+            if line.type != INSTRUCTION:
+                continue
+
+            for rule in PEEPHOLE_SINGLE_RULES:
+                r = rule(line, entries, layout)
+
+                if r is not None:
+                    apply_peephole(line, r)
+                    n_changes += 1
+                    break
+
+        n_peepholes += n_changes
+
+        if n_changes == 0:
+            break
+
+    n_passes += 1
+    verbose(f'PASS PEEPHOLE: Made {n_peepholes} change(s)')
+
+
+# -------------------------------------------------------------------
+# PASS LABELS - Construct symbol table by finding all labels
+
+# This is the equivalent of the traditional "Pass 1" in normal two-pass
+# assemblers. 
+
 verbose('PASS LABELS: Assigning value to all labels')
 
+# Each section has its own location counter. LCi stays relative to LC0, so when
+# we switch sections, we remember where we were in the old one and continue
+# where we left off in the new one, or at its start
+section = SECTION_DEFAULT
+section_lcs = {}
+
 for line in ir_source: 
 
+    if line.section != section:
+        section_lcs[section] = LCi
+        section = line.section
+        LCi = section_lcs.get(section, sections[section]-LC0)
+
     if line.status == DONE:
         continue
 
@@ -1728,6 +3334,10 @@ for line in ir_source:
 
     if CURRENT in line.parameters:
         LC = LC0 + LCi
+
+        if args.object:
+            current_terms[id(line)] = line.parameters
+
         line.parameters = line.parameters.replace(CURRENT, str(LC))
         line.status = MODIFIED
 
@@ -1745,18 +3355,7 @@ for line in ir_source:
 
         line.address = LC0+LCi
         line.status = MODIFIED
-        line.size = opcode_table[mnemonics[line.action]][2]
-
-        # Add extra byte according to register size for 65816
-        # immediate instructions such as lda.#
-        if MPU == '65816':
-
-            if line.action in A_IMM:
-                line.size += lc_offset(line.a_width)
-            elif line.action in XY_IMM:
-                line.size += lc_offset(line.xy_width)
-
-
+        line.size = instruction_size(line)
         LCi += line.size
         continue
 
@@ -1782,6 +3381,28 @@ for line in ir_source:
         continue
 
  
+    # --- SUBSTEP ALIGN: Convert .align directive to zero bytes ---
+
+    # We fill up with zeros until the address is a multiple of the parameter,
+    # so '.align 0x100' moves us to the start of the next page
+
+    if line.action == '.align':
+
+        line.address = LC0+LCi
+        r = convert_term(line, line.parameters)
+
+        if r < 1:
+            fatal(line, f'Illegal value {r} for ".align"')
+
+        line.size = -line.address % r
+        line.bytes = ' '.join(['00']*line.size)
+        line.status = DONE
+
+        verbose(f'- Converted ".align" in line {line.ln} to {line.size} zero byte(s)')
+        LCi += line.size
+        continue
+
+
     # --- SUBSTEP SAVE: Convert .save directive to zero bytes ---
     
     # TODO see if we need to add a label line here
@@ -1792,8 +3413,8 @@ for line in ir_source:
 
         # Add the symbol to the symbol list. This should be the first word of
         # the parameter string
-        vet_newsymbol(ws[0])
-        symbol_table[ws[0].lower()] = LC0+LCi
+        vet_newsymbol(line, ws[0])
+        set_symbol(sys.intern(ws[0]), LC0+LCi)
 
         # Number of bytes to save should be the second entry in the parameter
         # string
@@ -1833,6 +3454,63 @@ for line in ir_source:
         continue
 
 
+    # --- SUBSTEP IMPORT: Handle symbols shared with other modules ---
+
+    # Imported symbols come from other modules, so we don't know their value
+    # until tinklink puts the modules together. Here, they are zero, and every
+    # use gets a fixup record in PASS RELOCATE. Exported symbols are saved in
+    # STEP OBJECT
+
+    if line.action in ['.import', '.export']:
+
+        names = [w.strip() for w in line.parameters.split(',') if w.strip()]
+
+        if line.action == '.export':
+            exports.extend([(line, name) for name in names])
+
+        elif not args.object:
+            fatal(line, '".import" only works with --object')
+
+        else:
+
+            for name in names:
+                vet_newsymbol(line, name)
+                set_symbol(sys.intern(name), 0)
+                imports.append(name)
+
+            verbose(f'- Imported {len(names)} symbol(s) in line {line.ln}')
+
+        line.status = DONE
+        continue
+
+
+    # --- SUBSTEP TABLE: Reserve space for a generated table ---
+
+    # We only need the start and end of the index to know how large the table
+    # is, the math term is only run in PASS DATA
+
+    if line.action == '.table':
+
+        w = line.parameters.split(None, 3)
+
+        if len(w) != 4 or w[0] not in TABLE_WIDTHS:
+            fatal(line, '".table" needs "byte", "word" or "long", start, end and a math term')
+
+        start = convert_term(line, w[1])
+        end = convert_term(line, w[2])
+
+        if end < start:
+            fatal(line, f'End of table {end} is before start {start}')
+
+        line.address = LC0+LCi
+        line.size = (end-start+1) * TABLE_WIDTHS[w[0]]
+        line.status = MODIFIED
+
+        verbose(f'- Reserved {line.size} byte(s) for ".table" in line {line.ln}')
+        LCi += line.size
+        continue
+
+
     # --- SUBSTEP LABELS: Figure out where our labels are ---
 
     if line.type == LABEL:
@@ -1853,10 +3531,10 @@ for line in ir_source:
 
             # Remember to strip off the colon of the label before including it
             # in the symbol table
-            line.action = line.action[:-1]
+            line.action = sys.intern(line.action[:-1])
             verbose('- New label "{0}" found in line {1}, address {2:06x}'.\
                     format(line.action, line.ln, line.address))
-            symbol_table[line.action.lower()] = line.address
+            set_symbol(line.action, line.address)
             line.status = DONE
             continue
 
@@ -1906,51 +3584,204 @@ for line in ir_source:
 n_passes += 1
 
 
-# -------------------------------------------------------------------
-# PASS ASSIGN: Handle complex assignments
+# -------------------------------------------------------------------
+# PASS ASSIGN: Handle complex assignments
+
+# Complete all .equ statements. Now that we know all labels, every assignment
+# can be resolved, and we do them in the order of their dependencies so that
+# '.equ frog [ toad 1 + ]' works even if toad is assigned further down. After
+# this, the symbol table is complete
+
+assignments = assignment_order(ir_source)
+
+for symbol, line, term in assignments:
+    set_symbol(symbol, convert_term(line, term))
+    line.status = DONE
+
+n_passes += 1
+verbose('PASS ASSIGN: Assigned all remaining symbol(s) to symbol table')
+
+# Print symbol table
+if args.verbose:
+    dump_symbol_table(symbol_table, "after ASSIGN (numbers in hex)")
+
+
+# -------------------------------------------------------------------
+# PASS RELOCATE: Create fixup records for object files if requested
+
+# With --object, tinklink can move the code of this module to a different
+# address and has to change every byte that depends on where a label is or what
+# an imported symbol is. We have to find these before PASS REPLACE (2) turns the
+# labels into numbers. We can only do this for simple terms: a label or
+# imported symbol ('jsr frog'), plus or minus a number ('lda [ frog 2 + ]'),
+# and either of these with a modifier ('lda.# .msb frog'). Symbols assigned
+# with '.equ' from such a term move as well, as does the current line symbol.
+# Jumps to anonymous labels get a fixup of their own. Anything else that
+# uses a label or imported symbol is an error, because we can't tell if it
+# moves. Branches are relative, so they don't need fixups, but they can't
+# reach imported symbols. Each fixup is a list of the offset in the code, the
+# number of bytes, the kind of the fixup, the imported symbol or None for this
+# module, and a number that is added to the symbol or the new start of this
+# module
+
+RELATIVE_INS = list(INVERSE_BRANCHES.keys()) + ['bra', 'bra.l', 'phe.r']
+
+
+def simple_reference(line, ws, moving):
+    """Given a line object, a term split into words without a modifier, and
+    the set of symbols that move, return a tuple of the symbol the term uses
+    and the number that is added to it, or None if this is not a simple term
+    """
+    addend = 0
+
+    if len(ws) == 5 and ws[0] == LEFTMATH and ws[4] == RIGHTMATH and\
+            ws[2] not in moving and ws[3] in ['+', '-']:
+        addend = convert_term(line, ws[2]) * (-1 if ws[3] == '-' else 1)
+        ws = ws[1:2]
+
+    if len(ws) != 1 or ws[0] not in moving:
+        return None
+
+    return ws[0], addend
+
+
+def relocation(line, term):
+    """Given a line object and a term, return None if its value doesn't
+    depend on where the module ends up, else a tuple of the kind of fixup,
+    the imported symbol or None, and the number to add. Aborts with a fatal
+    error for terms we can't relocate.
+    """
+    ws = term.split()
+    moving = relocatable | set(imports) | import_aliases.keys() | fixed |\
+            {CURRENT}
+
+    if not set(ws) & moving:
+        return None
+
+    kind = 'addr'
+
+    if ws[0] in MODIFIERS:
+        kind = ws.pop(0)[1:]
+
+    r = simple_reference(line, ws, moving)
+
+    if r is None or r[0] in fixed:
+        fatal(line, f'Cannot relocate "{term}", use a label, plus or minus a '\
+                'number, or a modifier with these')
+
+    symbol, addend = r
+
+    if symbol in imports:
+        return kind, symbol, addend
+
+    # Imported symbols are zero, so the value of the alias is what is added
+    if symbol in import_aliases:
+        return kind, import_aliases[symbol], symbol_table[symbol] + addend
+
+    if symbol == CURRENT:
+        return kind, None, line.address - LC0 + addend
+
+    return kind, None, symbol_table[symbol] - LC0 + addend
+
+
+if args.object:
+
+    # Labels and symbols from .save move with the module, everything else
+    # stays where it is
+    relocatable = set()
+
+    for line in ir_source:
+
+        if line.type == LABEL and line.action != LOCAL_LABEL:
+            relocatable.add(line.action)
+
+        elif line.action == '.save':
+            relocatable.add(line.parameters.split()[0])
+
+    # Assignments that use a label or imported symbol in a simple term move
+    # with it, those that use them in any other way can't be relocated. We
+    # go through them in order so chains of assignments work
+    import_aliases = {}
+    fixed = set()
+
+    for symbol, line, term in assignments:
+        ws = term.split()
+        moving = relocatable | set(imports) | import_aliases.keys() | fixed
+
+        if not set(ws) & moving:
+            continue
+
+        r = simple_reference(line, ws, moving)
+
+        if r is None or r[0] in fixed:
+            fixed.add(symbol)
+        elif r[0] in imports:
+            import_aliases[symbol] = r[0]
+        elif r[0] in import_aliases:
+            import_aliases[symbol] = import_aliases[r[0]]
+        else:
+            relocatable.add(symbol)
+
+    for line in ir_source:
+
+        if line.status == DONE:
+            continue
+
+        offset = line.address - LC0
+        term = current_terms.get(id(line), line.parameters)
+
+        if line.type == INSTRUCTION:
+
+            # Anonymous labels are always in this module
+            target = anonymous_target(line)
+
+            if line.action not in RELATIVE_INS and target is not None:
+                fixups.append([offset+1, line.size-1, 'addr', None,\
+                        target - LC0])
+                continue
+
+            r = relocation(line, term)
+
+            if r is None:
+                continue
+
+            if line.action in RELATIVE_INS:
+
+                if r[1] is not None:
+                    fatal(line, f'Branch to imported symbol "{r[1]}", use a jump')
+
+                continue
 
-# Complete all .equ statements
+            if line.action in ['mvp', 'mvn']:
+                fatal(line, f'Cannot relocate "{line.parameters}" of move instruction')
 
-for line in ir_source:
+            fixups.append([offset+1, line.size-1, *r])
 
-    if (line.status == DONE) or (line.action != ASSIGNMENT):
-        continue
+        elif line.action in DATA_DIRECTIVES:
 
-    w = line.parameters.split(' ', 1)
-    vet_newsymbol(w[0])
+            width = TABLE_WIDTHS[line.action[1:]]
 
-    # In '.equ frog abc', 'abc' can either be a symbol or a number. We want it
-    # to be a symbol by default, so we check the symbol table first
-    try:
-        r = symbol_table[w[1]]
-    except KeyError:
-        pass
-    else:
-        symbol_table[w[0]] = r
-        line.status = DONE
-        continue
+            for i, t in enumerate(data_terms(term)):
+                r = relocation(line, t)
 
-    rs = convert_term(line, w[1])
+                if r is not None:
+                    fixups.append([offset + i*width, width, *r])
 
-    # If it's a number, add it to the symbol table, otherwise we'll have to wait
-    # until we've figured out more stuff
-    if f_num:
-        symbol_table[w[0]] = rs
-        line.status = DONE
+        elif line.action == '.table':
 
-n_passes += 1
-verbose('PASS ASSIGN: Assigned all remaining symbol(s) to symbol table')
+            if set(term.split()) & (relocatable | set(imports) |\
+                    import_aliases.keys() | fixed | {CURRENT}):
+                fatal(line, 'Cannot relocate ".table" that uses labels')
 
-# Print symbol table
-if args.verbose:
-    dump_symbol_table(symbol_table, "after ASSIGN (numbers in hex)")
+    n_passes += 1
+    verbose(f'PASS RELOCATE: Created {len(fixups)} fixup record(s)')
 
 
 # -------------------------------------------------------------------
 # PASS REPLACE (2): Handle known assignments
 
 # At this point, we still haven't handled symbols in .BYTE etc directives
-replace_symbols(ir_source)
+replace_symbols()
 
 n_passes += 1
 
@@ -1970,26 +3801,36 @@ verbose('CLAMING that all symbols are now known')
 
 # TODO see what happens if there is a local (anon) label in the data directive
 
+# Tables can have thousands of math terms such as '[ base 2 * ]', so instead of
+# going through do_math() for each one, we collect them all and hand them to the
+# math engine in one go. If something goes wrong, we don't use the results and
+# let convert_term() find the line with the problem
+batch_terms = []
+
 for line in ir_source:
 
     if (line.status == DONE) or (line.action not in DATA_DIRECTIVES):
         continue
 
-    # Make sure there is no trailing comma, or the split will produce an
-    # extra empty entry in the list, throwing our count off. We only catch
-    # one comma. We've already converted all strings and characters so we
-    # don't have to be worried we'll get one of those by mistake
-    p = line.parameters.strip()
+    batch_terms.extend([t[1:-1] for t in data_terms(line.parameters) if is_math_term(t)])
 
-    if p[-1] == ',':
-        p = p[:-1] 
+batch_values, ok = batch_engine(batch_terms, symbol_table)
+batch_values = iter(batch_values)
+
+for line in ir_source:
+
+    if (line.status == DONE) or (line.action not in DATA_DIRECTIVES):
+        continue
 
     # We work with a list of terms
-    ts = (p.split(','))
     new_ts = []
 
-    for t in ts: 
-        new_ts.append(convert_term(line, t))
+    for t in data_terms(line.parameters): 
+
+        if ok and is_math_term(t):
+            new_ts.append(next(batch_values))
+        else:
+            new_ts.append(convert_term(line, t))
 
     # We now have a list of the numbers, but need to break them down into
     # their bytes. This could be solved a lot more elegantly, but this is
@@ -2015,6 +3856,41 @@ for line in ir_source:
     line.status = DONE
     line.size = len(byte_list)
 
+
+# Generated tables such as '.table byte 0 255 [ .i 2 * .lsb ]' run the math term
+# once for each index. All of them have the same form, so the math engine can
+# do them in one go
+for line in ir_source:
+
+    if (line.status == DONE) or (line.action != '.table'):
+        continue
+
+    kind, start, end, term = line.parameters.split(None, 3)
+    term = term.strip()
+
+    if not is_math_term(term):
+        fatal(line, f'".table" needs a math term, not "{term}"')
+
+    ws = term[1:-1].split()
+    indices = range(convert_term(line, start), convert_term(line, end)+1)
+    table_terms = [' '.join([str(i) if w == TABLE_INDEX else w for w in ws])\
+            for i in indices]
+
+    values, ok = batch_engine(table_terms, symbol_table)
+
+    if not ok:
+        fatal(line, f'Math engine failed on table term "{term}"')
+
+    width = TABLE_WIDTHS[kind]
+
+    for i, v in zip(indices, values):
+
+        if not 0 <= v < 1 << 8*width:
+            fatal(line, f'Value {v} for index {i} does not fit into a {kind}')
+
+    line.bytes = b''.join([v.to_bytes(width, 'little') for v in values]).hex(' ')
+    line.status = DONE
+
 n_passes += 1
 verbose('PASS DATA: Converted all data formats to .byte lists')
 
@@ -2044,6 +3920,7 @@ for line in ir_source:
     
 n_passes += 1
 verbose('PASS MATH: replaced all math terms by numbers')
+verbose(f'- Math terms: {n_math_hits} found in cache, {n_math_misses} calculated')
 
 
 # -------------------------------------------------------------------
@@ -2105,21 +3982,11 @@ for line in ir_source:
     if (line.status == DONE) or (line.type != INSTRUCTION):
         continue
 
-    if line.parameters.strip() == '+':   # strip() is paranoid
-        for ln, ll in anon_labels:
-
-            if ln > line.ln:
-                line.parameters = str(ll)
-                line.status = MODIFIED
-                break
-
-    if line.parameters.strip() == '-':   # strip() is paranoid
-        for ln, ll in reversed(anon_labels):
+    ll = anonymous_target(line)
 
-            if ln < line.ln:
-                line.parameters = str(ll)
-                line.status = MODIFIED
-                break
+    if ll is not None:
+        line.parameters = str(ll)
+        line.status = MODIFIED
 
 n_passes += 1
 verbose('PASS ANONYMOUS: Replaced all anonymous labels with address values')
@@ -2173,9 +4040,9 @@ for line in ir_source:
     if (line.status == DONE) or (line.type != INSTRUCTION):
         continue
 
-    # We treat this as a special case. Check for MPU so we don't suddenly allow
-    # a 6502 to do a long branch
-    if (line.action == 'bra.l') and (MPU == '65816'):
+    # We treat these as a special case because they have a 16 bit offset.
+    # Check for MPU so we don't suddenly allow a 6502 to do a long branch
+    if (line.action in ['bra.l', 'phe.r']) and (MPU == '65816'):
         f_num, target_addr = convert_number(line.parameters)
 
         if not f_num:
@@ -2192,10 +4059,16 @@ for line in ir_source:
         _, target_addr = convert_number(line.parameters)
 
         try: 
-            opr = hexstr(2, lsb(line, target_addr - line.address - 2))
+            offset = target_addr - line.address - 2
         except TypeError:
             fatal(line, 'TypeError while calculating branch adress') 
 
+        if not -128 <= offset <= 127:
+            fatal(line, f'Branch target {target_addr:06x} out of range '\
+                    f'({offset} bytes), see --relax-branches')
+
+        opr = hexstr(2, lsb(line, offset))
+
         line.bytes = hexstr(2, mnemonics[line.action])+' '+opr
         line.status = DONE
         continue
@@ -2314,12 +4187,137 @@ n_passes +=1
 verbose('PASS BYTE CHECK: Confirmed all byte values are in range from 0 to 255')
 
 
+# -------------------------------------------------------------------
+# PASS PAGES: Warn about page boundaries if requested
+
+# Taken branches to a different page take an extra cycle, as do indexed reads
+# that cross a page. We warn about branches where this happens and about tables
+# that start with a label and cross a page, because these are usually read with
+# an index. The 65816 in native mode doesn't care about branches. Use '.align'
+# to move things around
+
+def data_tables(src):
+    """Given a list of line objects, return a list of the tables, each as a
+    list of the label line and the address after its last byte. Tables are
+    data directives directly after a label.
+    """
+    tables = []
+    table = None
+
+    for line in src:
+
+        if line.type in [COMMENT, WHITESPACE]:
+            continue
+
+        if line.type == LABEL and line.action != LOCAL_LABEL:
+            table = [line, line.address]
+            continue
+
+        if table and (line.action in DATA_DIRECTIVES or line.action == '.table'):
+
+            if table[1] == table[0].address:
+                tables.append(table)
+
+            table[1] = line.address + line.size
+            continue
+
+        table = None
+
+    return tables
+
+
+if args.pages:
+
+    n_page_warnings = 0
+
+    for line in ir_source:
+
+        # Branches removed by PASS DEAD CODE or PASS PEEPHOLE are comments
+        # now, but still have their action
+        if line.type != INSTRUCTION or not line.bytes:
+            continue
+
+        if line.action not in BRANCHES[MPU] or line.action in ['bra.l', 'phe.r']:
+            continue
+
+        if MPU == '65816' and line.mode == 'na':
+            continue
+
+        # Offsets are relative to the address after the branch
+        offset = int(line.bytes.split()[1], 16)
+        next_address = line.address + 2
+        target = next_address + offset - 256*(offset > 0x7f)
+
+        if (target ^ next_address) & 0xff00:
+            warning(f'Branch in line {line.ln} to {target:06x} crosses page '\
+                    f'(extra cycle when taken)')
+            n_page_warnings += 1
+
+    for label, end in data_tables(ir_source):
+
+        if label.address >> 8 != (end-1) >> 8:
+            warning(f'Table "{label.action}" in line {label.ln} crosses page '\
+                    f'({label.address:06x} to {end-1:06x})')
+            n_page_warnings += 1
+
+    n_passes += 1
+    verbose(f'PASS PAGES: Found {n_page_warnings} page crossing(s)')
+
+
+# -------------------------------------------------------------------
+# PASS BANKS: Check bank boundaries on the 65816
+
+# The program counter of the 65816 wraps around to the start of the bank
+# instead of going on to the next one. An instruction that crosses a bank
+# boundary can never work, and code that doesn't end with a jump or return
+# before the end of a bank runs into the start of the same bank, not the next
+# one. We warn about tables that cross a bank as well, because they are
+# usually not meant to
+
+if MPU == '65816':
+
+    n_bank_warnings = 0
+    previous = None
+
+    for line in ir_source:
+
+        if not line.size:
+            continue
+
+        if line.type == INSTRUCTION:
+
+            if line.address >> 16 != (line.address+line.size-1) >> 16:
+                fatal(line, f'Instruction at {line.address:06x} crosses bank '\
+                        'boundary (PC wraps around in bank)')
+
+            if line.address & 0xffff == 0 and previous and\
+                    previous.type == INSTRUCTION and\
+                    previous.action not in STOP_INS and\
+                    previous.address+previous.size == line.address:
+                warning(f'Code in line {previous.ln} runs into bank '\
+                        f'{line.address >> 16:02x} (PC wraps around in bank)')
+                n_bank_warnings += 1
+
+        previous = line
+
+    for label, end in data_tables(ir_source):
+
+        if label.address >> 16 != (end-1) >> 16:
+            warning(f'Table "{label.action}" in line {label.ln} crosses bank '\
+                    f'({label.address:06x} to {end-1:06x})')
+            n_bank_warnings += 1
+
+    n_passes += 1
+    verbose(f'PASS BANKS: Found {n_bank_warnings} bank crossing(s)')
+
+
 # -------------------------------------------------------------------
 # PASS OPTIMIZE: Analyze and optimize code
 
-# We don't perform automatic optimizations at the moment, but only provide
-# suggestions and warnings here. We need the line numbers so we can offer
-# the user suggestions based on his original source code
+# Automatic optimizations are done before PASS LABELS (see PASS LAYOUT and
+# PASS PEEPHOLE), here we only provide suggestions and warnings. We need the
+# line numbers so we can offer the user suggestions based on his original
+# source code
 
 verbose('PASS ANALYZE: Searched for obvious errors and improvements')
 
@@ -2332,9 +4330,9 @@ for line in ir_source:
 
         # --- SUBSTEP WDM: Check to see if we have WDM instruction --- 
         # TODO make sure this doesn't find WDM in data
-        ws = line.bytes
+        ws = line.bytes.split()
 
-        if w[0] == '42':
+        if ws[0] == '42':
             warning('Reserved instruction WDM (0x42) found in line {0}'.\
                     format(line.ln))
             continue
@@ -2345,9 +4343,11 @@ n_passes += 1
 # -------------------------------------------------------------------
 # PASS BINARY: Convert lists of bytes into one byte array
 
-# Take all lines that are not DONE and write their values to 
+# Take all lines that are not DONE and write their values to the block of
+# their section. Each section is one contiguous block, so we don't have to fill
+# the space between them. The code of the default section is the object code
 
-byte_list = []
+byte_lists = {name: [] for name in sections}
 
 for line in ir_source:
 
@@ -2355,26 +4355,270 @@ for line in ir_source:
         continue 
 
     line.bytes = line.bytes.strip()     # paranoid 
-    bl = [int(b, 16) for b in line.bytes.split()]
-    byte_list.extend(bl)
-    
-objectcode = bytes(byte_list)
-code_size = len(objectcode)
+    byte_lists[line.section].extend(bytes.fromhex(line.bytes))
+
+# Sections may not overlap, including those that are not saved. Empty sections
+# don't take up any space
+previous = None
+
+for name, start in sorted(sections.items(), key=lambda kv: kv[1]):
+
+    if not byte_lists[name]:
+        continue
+
+    if previous and sections[previous]+len(byte_lists[previous]) > start:
+        end = sections[previous]+len(byte_lists[previous])-1
+
+        if name in origin_lines:
+            fatal(origin_lines[name], f'".origin" at {start:06x} is inside '\
+                    f'the code of "{previous}" ({sections[previous]:06x}-{end:06x})')
+
+        if previous in origin_lines:
+            fatal(origin_lines[previous], f'Code after ".origin" at '\
+                    f'{sections[previous]:06x} runs to {end:06x}, into "{name}" at {start:06x}')
+
+        print('FATAL: Section "{0}" ({1:06x}-{2:06x}) overlaps section "{3}" '\
+                'at {4:06x}, aborting.'.format(previous, sections[previous],\
+                sections[previous]+len(byte_lists[previous])-1, name, start))
+        sys.exit(1)
+
+    previous = name
+
+    if name not in noload_sections:
+        blocks.append((name, start, bytes(byte_lists[name])))
+
+objectcode = bytes(byte_lists[SECTION_DEFAULT])
+code_size = sum(len(b) for _, _, b in blocks)
 
 n_passes += 1
-verbose(f'PASS BINARY: Combined byte lists to {len(objectcode)} bytes of final code')
+verbose(f'PASS BINARY: Combined byte lists to {code_size} bytes of final code '\
+        f'in {len(blocks)} block(s)')
+
+
+# -------------------------------------------------------------------
+# STEP MAP: Create memory map if requested
+
+# Every byte of the final code is attributed to the closest label before it,
+# except for the zeros of .skip, .advance, .align and .save, which are listed as
+# regions of their own. Anonymous labels don't start a new entry. Bytes before
+# the first label are listed as "(origin)", those at the start of other
+# sections with the name of the section, such as "(rodata)". Bytes of a label
+# that come after a fill are listed as a region of their own, such as "loop
+# (cont.)", so the regions don't overlap
+
+if args.map:
+
+    # Each region is a list of name, kind, first address, address after the
+    # last byte, and size in bytes
+    regions = []
+    region = None
+
+    # The label the bytes belong to, if any
+    label = None
+
+    for line in ir_source:
+
+        if line.type == LABEL and line.action != LOCAL_LABEL:
+            label = line.action
+            region = [label, 'label', line.address, line.address, 0]
+            regions.append(region)
+            continue
+
+        if line.action in ['.section', '.origin']:
+            label = None
+            region = None
+            continue
+
+        if not line.bytes:
+            continue
+
+        if line.action in ['.skip', '.advance', '.save', '.align']:
+
+            if line.action == '.save':
+                name = line.parameters.split()[0]
+            else:
+                name = f'{line.action} line {line.ln}'
+
+            regions.append([name, 'fill', line.address,\
+                    line.address+line.size, line.size])
+            region = None
+            continue
+
+        if not region and label:
+            region = [f'{label} (cont.)', 'label', line.address, line.address, 0]
+            regions.append(region)
+
+        if not region:
+
+            if line.section == SECTION_DEFAULT:
+                name = '(origin)'
+            else:
+                name = f'({line.section})'
+
+            region = [name, 'code', line.address, line.address, 0]
+            regions.append(region)
+
+        region[3] = line.address+line.size
+        region[4] += line.size
+
+    def map_entry(r):
+        """Given a region, return a string for the memory map"""
+        if r[4] == 0:
+            end = '     -'
+        else:
+            end = hexstr(6, r[3]-1)
+
+        percent = 100*r[4]/code_size if code_size else 0
+
+        return '{0} {1} {2:8} {3:6.2f}%  {4:5}  {5}'.\
+                format(hexstr(6, r[2]), end, r[4], percent, r[1], r[0])
+
+    with open(MAP_FILE, 'w') as f:
+        f.write(TITLE_STRING)
+        f.write(f'Memory map of {args.source}')
+        f.write(f' (total of {code_size} bytes)\n')
+        f.write('Generated on {0}\n'.format(time.asctime(time.localtime())))
+
+        map_header = 'Start  End       Bytes Percent  Kind   Name\n'
+
+        f.write('\nBY ADDRESS:\n'+map_header)
+
+        # With sections, the regions are not in order of their addresses
+        for r in sorted(regions, key=lambda r: r[2]):
+            f.write(map_entry(r)+'\n')
+
+        f.write('\nBY SIZE:\n'+map_header)
+
+        for r in sorted(regions, key=lambda r: r[4], reverse=True):
+            f.write(map_entry(r)+'\n')
+
+    n_steps += 1
+    verbose(f'STEP MAP: Saved memory map with {len(regions)} region(s) as {MAP_FILE}')
 
 
 # -------------------------------------------------------------------
 # STEP SAVEBIN: Save binary file
 
+# The default section goes to the output file, every other section that is
+# saved gets its own file with the name of the section added, so "rodata" ends
+# up in "tink.rodata.bin"
+
 with open(args.output, 'wb') as f:
     f.write(objectcode)
 
+out_root, out_dot, out_ext = args.output.rpartition('.')
+
+if not out_dot:
+    out_root, out_ext = out_ext, ''
+else:
+    out_ext = out_dot+out_ext
+
+for name, start, data in blocks:
+
+    if name == SECTION_DEFAULT:
+        continue
+
+    section_file = f'{out_root}.{name}{out_ext}'
+
+    with open(section_file, 'wb') as f:
+        f.write(data)
+
+    verbose(f'- Saved section "{name}" ({start:06x}, {len(data)} bytes) as {section_file}')
+
 n_steps += 1
 verbose(f'STEP SAVE BINARY: Saved object code as {args.output}')
 
 
+# -------------------------------------------------------------------
+# STEP BANKS: Save one binary file per bank if requested
+
+# Large ROMs for the 65816 are mapped across banks, so each bank is burned as
+# its own image. We cut the blocks of the sections into banks as they are,
+# starting each image at the start of the bank, or the start of the window if
+# only part of each bank is ROM. Gaps are filled with zeros. Bank 3 of
+# "tink.bin" ends up in "tink.bank03.bin"
+
+if args.banks:
+
+    w_start, w_end = args.bank_window or (0, 0xffff)
+    images = {}
+
+    for name, start, data in blocks:
+
+        a = start
+        i = 0
+
+        while i < len(data):
+            offset = a & 0xffff
+
+            if not w_start <= offset <= w_end:
+                print('FATAL: Section "{0}" has code at {1:06x}, outside of '\
+                        'bank window {2:04x}-{3:04x}, aborting.'.\
+                        format(name, a, w_start, w_end))
+                sys.exit(1)
+
+            n = min(len(data)-i, w_end+1-offset)
+            image = images.setdefault(a >> 16, bytearray(w_end-w_start+1))
+            image[offset-w_start:offset-w_start+n] = data[i:i+n]
+            a += n
+            i += n
+
+    for bank in sorted(images):
+        bank_file = f'{out_root}.bank{bank:02x}{out_ext}'
+
+        with open(bank_file, 'wb') as f:
+            f.write(images[bank])
+
+        verbose(f'- Saved bank {bank:02x} as {bank_file}')
+
+    n_steps += 1
+    verbose(f'STEP BANKS: Saved {len(images)} bank image(s) of '\
+            f'{w_end-w_start+1} bytes each')
+
+
+# -------------------------------------------------------------------
+# STEP OBJECT: Save relocatable object file if requested
+
+# The object file is a JSON file with the code as it was assembled here, the
+# exported and imported symbols, and the fixups from PASS RELOCATE. Exported
+# symbols that move with the module are given as offsets from its start. See
+# tinklink/tinklink.py for what happens to it then
+
+if args.object:
+
+    exported = {}
+
+    for line, name in exports:
+
+        try:
+            value = symbol_table[name]
+        except KeyError:
+            fatal(line, f'Exported symbol "{name}" not defined')
+
+        if name in imports or name in import_aliases:
+            fatal(line, f'Cannot export imported symbol "{name}"')
+
+        if name in fixed:
+            fatal(line, f'Cannot export "{name}", it can\'t be relocated')
+
+        if name in relocatable:
+            exported[name] = (value - LC0, True)
+        else:
+            exported[name] = (value, False)
+
+    obj = {'format': OBJECT_FORMAT, 'version': OBJECT_VERSION,\
+            'source': args.source, 'mpu': MPU, 'origin': LC0,\
+            'code': objectcode.hex(), 'exports': exported,\
+            'imports': imports, 'fixups': fixups}
+
+    with open(OBJECT_FILE, 'w') as f:
+        json.dump(obj, f, separators=(',', ':'))
+
+    n_steps += 1
+    verbose(f'STEP OBJECT: Saved {len(exported)} export(s), {len(imports)} '\
+            f'import(s) and {len(fixups)} fixup(s) as {OBJECT_FILE}')
+
+
 # -------------------------------------------------------------------
 # STEP S28: Create S28 date file if requested
 
@@ -2473,21 +4717,18 @@ if args.s28:
     s0_line = make_s0(data_string)
     s8_line = make_s8(LC0)
 
+    # Each section is written with its own addresses
     with open(S28_FILE, 'w') as f:
         f.write(s0_line+'\n')
 
-        h_data = ''
-
-        for c in objectcode:
-            h_data = h_data+'{0:02x}'.format(c)
+        for _, a, data in blocks:
 
-        t = h_data
-        a = LC0
+            t = data.hex()
 
-        while t:
-            f.write(make_s2(t[:64], a)+'\n')
-            t = t[64:]
-            a += 32
+            while t:
+                f.write(make_s2(t[:64], a)+'\n')
+                t = t[64:]
+                a += 32
 
         f.write(s8_line+'\n')
 
@@ -2504,53 +4745,174 @@ if args.hexdump:
         f.write(TITLE_STRING)
         f.write(f'Hexdump file of {args.source}')
         f.write(f' (total of {code_size} bytes)\n')
-        f.write('Generated on {0}\n\n'.\
+        f.write('Generated on {0}\n'.\
                 format(time.asctime(time.localtime())))
-        a65 = LC0
-        f.write('{0:06x}: '.format(a65))
 
-        c = 0
+        # Each section starts a new part of the dump at its own address
+        for name, a65, data in blocks:
+
+            if len(sections) > 1:
+                f.write(f'\nSection "{name}":')
 
-        for e in objectcode:
-            f.write('{0:02x} '.format(e))
-            c += 1
-            if c % 16 == 0:
-                f.write('\n')
-                a65 += 16
-                f.write('{0:06x}: '.format(a65))
-        f.write('\n')
+            f.write('\n{0:06x}: '.format(a65))
+
+            c = 0
+
+            for e in data:
+                f.write('{0:02x} '.format(e))
+                c += 1
+                if c % 16 == 0:
+                    f.write('\n')
+                    a65 += 16
+                    f.write('{0:06x}: '.format(a65))
+            f.write('\n')
 
     n_steps += 1
     verbose(f'STEP HEXDUMP: Saved hexdump file {HEX_FILE} as requested')
 
 
 # -------------------------------------------------------------------
-# STEP LIST: Create listing file if requested
+# STEP JSON: Create JSON Lines file if requested
+
+if args.json:
+
+    with open(JSON_FILE, 'w') as f:
+        f.writelines(l+'\n' for l in make_json(ir_source))
+
+    n_steps += 1
+    verbose(f'STEP JSON: Saved IR and symbol table as {JSON_FILE}')
+
+
+# -------------------------------------------------------------------
+# STEP SYMBOLS: Create label file for debuggers and emulators if requested
+
+# VICE loads these with "ll" in the monitor, MAME with "source" in the
+# debugger (as comments, it has no user labels), and py65mon executes them as
+# monitor commands. VICE only knows 16 bit addresses.
+
+if args.symbols:
+
+    # Keep these definitions here. The address is four or six hex digits,
+    # depending on if it is a 16 or 24 bit address
+    SYMBOL_FORMATS = {
+        'vice': 'al C:{0} .{1}',
+        'mame': 'comadd {0},{1}',
+        'py65mon': 'add_label {0} {1}',
+        'plain': '{0} {1}'}
+
+    # Anonymous labels don't have names, so we use their line number
+    sym_list = [(v, k) for k, v in symbol_table.items()]
+    sym_list.extend([(a, f'anon_{ln}') for ln, a in anon_labels])
+    sym_list.sort()
+
+    n_symbols = 0
+
+    with open(SYM_FILE, 'w') as f:
+
+        for a, name in sym_list:
 
-if args.listing:
+            if a > 0xffff:
+
+                if args.symbols == 'vice':
+                    warning(f'Skipped 24 bit symbol "{name}" for VICE label file')
+                    continue
+
+                width = 6
+
+            else:
+                width = 4
+
+            f.write(SYMBOL_FORMATS[args.symbols].format(hexstr(width, a), name)+'\n')
+            n_symbols += 1
 
     n_steps += 1
+    verbose(f'STEP SYMBOLS: Saved {n_symbols} symbol(s) in {args.symbols} format as {SYM_FILE}')
+
+
+# -------------------------------------------------------------------
+# STEP RUN: Run code in the simulator if requested
+
+# We run the code like a subroutine until it returns to us, or until it hits
+# a brk, cop, stp or wai instruction. The simulator uses the opcode table we
+# already loaded
+
+if args.run:
+
+    from simulator.simulator import Simulator
+
+    try:
+        run_address = symbol_table[args.run.lower()]
+    except KeyError:
+        print(f'FATAL: Label "{args.run}" for --run not found, aborting.')
+        sys.exit(1)
+
+    sim = Simulator(opcode_table, MPU)
+
+    for _, start, data in blocks:
+        sim.load(data, start)
 
-    with open(LIST_FILE, 'w') as f:
-        for l in make_listing(ir_source):
-            f.write(l+'\n') 
+    # We only hand over the dictionary if we need it because this is slower
+    if args.profile:
+        run_options = {'profile': run_profile}
+    else:
+        run_options = {}
+
+    time_run = timeit.default_timer()
+    run_cycles, run_instructions, run_stop = sim.run(run_address, **run_options)
+    time_run = timeit.default_timer() - time_run
+
+    print(f'Ran "{args.run}" at {run_address:06x}: {run_instructions} '\
+            f'instruction(s), {run_cycles} cycle(s), stopped at {run_stop}')
+
+    if args.profile:
+        print()
 
-    verbose(f'STEP LIST: Saved listing as {LIST_FILE}')
+        for l in hot_spots(ir_source, 10):
+            print(l)
+
+    n_steps += 1
+    verbose(f'STEP RUN: Simulated {run_instructions} instruction(s) in '\
+            f'{time_run:.5f} seconds')
 
 
 # -------------------------------------------------------------------
-# STEP PRINT: Print listing to screen if requested
+# STEP LIST: Create listing file and/or print listing to screen if requested
 
-if args.print: 
+# The listing is generated line by line and only once, even if it goes both to
+# the file and the screen
+
+if args.listing or args.print:
 
     n_steps += 1
-    print () 
 
-    for l in make_listing(ir_source):
-        print(l)
+    if args.print:
+        print()
+
+    def write_listing(f):
+        """Write the listing to the file object if we got one, and print it
+        if requested
+        """
+        for l in make_listing(ir_source, args.list_range):
+
+            if f:
+                f.write(l+'\n')
+
+            if args.print:
+                print(l)
+
+    if args.listing:
+
+        with open(LIST_FILE, 'w') as f:
+            write_listing(f)
+
+        verbose(f'STEP LIST: Saved listing as {LIST_FILE}')
+
+    else:
+        write_listing(None)
 
-    print()
-    verbose(f'STEP LIST: Saved listing as {LIST_FILE}')
+    if args.print:
+        print()
+        verbose('STEP PRINT: Printed listing to screen')
 
 
 # -------------------------------------------------------------------
@@ -0,0 +1,50 @@
+# Tests for the Linker of Tinkasm
+# Scot W. Stevenson <scot.stevenson@gmail.com>
+# First version: 18. Oct 2026
+# This version: 18. Oct 2026
+
+# From this directory, run "python3 -m unittest"
+
+import unittest
+
+from tinklink import link
+
+def module(name, code, exports=None, fixups=None, origin=0):
+    """Return an object dictionary as load_object() would"""
+    return {'name': name, 'format': 'tinkobj', 'version': 1, 'mpu': '6502',\
+            'origin': origin, 'code': code, 'exports': exports or {},\
+            'imports': [], 'fixups': fixups or []}
+
+
+class TestLink(unittest.TestCase):
+
+    def test_relocate(self):
+        # start: jmp start
+        m = module('a', '4c0080', {'start': (0, True)}, [[1, 2, 'addr', None, 0]],\
+                origin=0x8000)
+        code, symbols, modules, ok = link([m], 0x1000)
+        self.assertTrue(ok)
+        self.assertEqual(code, bytes([0x4c, 0x00, 0x10]))
+        self.assertEqual(symbols, {'start': 0x1000})
+
+    def test_import(self):
+        # jsr print / rts ... print: lda.# .msb print / rts
+        a = module('a', '20000060', fixups=[[1, 2, 'addr', 'print', 0]])
+        b = module('b', 'a90060', {'print': (0, True), 'io': (0xd000, False)},\
+                [[1, 1, 'msb', None, 0]])
+        code, symbols, modules, ok = link([a, b], 0x8000)
+        self.assertTrue(ok)
+        self.assertEqual(code.hex(), '20048060a98060')
+        self.assertEqual(symbols, {'print': 0x8004, 'io': 0xd000})
+        self.assertEqual(modules, [('a', 0x8000), ('b', 0x8004)])
+
+    def test_errors(self):
+        a = module('a', '200000', fixups=[[1, 2, 'addr', 'frog', 0]])
+        self.assertFalse(link([a])[3])
+
+        b = module('b', '60', {'x': (0, True)})
+        self.assertFalse(link([b, b])[3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+# A Linker for the Tinkerer's Assembler
+# Scot W. Stevenson <scot.stevenson@gmail.com>
+# First version: 18. Oct 2026
+# This version: 18. Oct 2026
+"""Put object files created by Tinkasm with --object together into one
+binary file, resolving the symbols the modules import from each other"""
+
+# The modules are placed one after the other, starting at the origin given on
+# the command line or the origin of the first module. None of the assembler
+# passes are run again: The code of each module is copied as it is and then
+# the bytes listed in the fixup records are changed to the new addresses.
+#
+#       python3 tinklink.py -o forth.bin --origin 0x8000 kernel.obj words.obj
+
+import argparse
+import json
+import sys
+
+# Format and version of the object files we understand. Tinkasm uses the same
+# values when it saves them
+OBJECT_FORMAT = 'tinkobj'
+OBJECT_VERSION = 1
+
+# Kinds of fixups and what they do to the final address before it is stored
+FIXUP_KINDS = {
+        'addr': lambda v: v,
+        'lsb': lambda v: v & 0xff,
+        'msb': lambda v: (v & 0xff00) >> 8,
+        'bank': lambda v: (v & 0xff0000) >> 16}
+
+
+def load_object(filename):
+    """Given the name of an object file, return its contents as a
+    dictionary, or None with an error message if we can't use it
+    """
+    try:
+        with open(filename, 'r') as f:
+            obj = json.load(f)
+    except (OSError, ValueError) as err:
+        print(f'LINK ERROR: Can\'t read object file "{filename}": {err}')
+        return None
+
+    if obj.get('format') != OBJECT_FORMAT or obj.get('version') != OBJECT_VERSION:
+        print(f'LINK ERROR: "{filename}" is not a version {OBJECT_VERSION} object file')
+        return None
+
+    obj['name'] = filename
+    return obj
+
+
+def link(objects, origin=None):
+    """Given a list of object dictionaries and the address of the first
+    module, place the modules one after the other and apply all fixups.
+    If there is no origin, use the one of the first module. Return the
+    code as bytes, a dictionary of the exported symbols and their final
+    values, the list of modules with their addresses, and a flag showing
+    success or failure.
+    """
+    ok = True
+
+    if origin is None:
+        origin = objects[0]['origin']
+
+    # Place the modules and find out where all exported symbols end up
+    symbols = {}
+    modules = []
+    base = origin
+
+    for obj in objects:
+
+        if obj['mpu'] != objects[0]['mpu']:
+            print(f'LINK ERROR: "{obj["name"]}" is for the {obj["mpu"]}, '\
+                    f'not the {objects[0]["mpu"]}')
+            ok = False
+
+        modules.append((obj['name'], base))
+
+        for name, (value, relocatable) in obj['exports'].items():
+
+            if name in symbols:
+                print(f'LINK ERROR: "{name}" exported by "{obj["name"]}" '\
+                        'and another module')
+                ok = False
+
+            symbols[name] = base + value if relocatable else value
+
+        base += len(obj['code']) // 2
+
+    # Copy the code and apply the fixups
+    code = bytearray()
+
+    for obj, (_, base) in zip(objects, modules):
+
+        mc = bytearray.fromhex(obj['code'])
+
+        for offset, width, kind, symbol, addend in obj['fixups']:
+
+            if symbol is None:
+                value = base + addend
+            else:
+
+                try:
+                    value = symbols[symbol] + addend
+                except KeyError:
+                    print(f'LINK ERROR: "{symbol}" imported by "{obj["name"]}" '\
+                            'is not exported by any module')
+                    ok = False
+                    continue
+
+            value = FIXUP_KINDS[kind](value)
+            mc[offset:offset+width] = (value & ((1 << 8*width) - 1)).\
+                    to_bytes(width, 'little')
+
+        code.extend(mc)
+
+    return bytes(code), symbols, modules, ok
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('objects', nargs='+', metavar='OBJECT',\
+            help='Object files created by Tinkasm with --object')
+    parser.add_argument('-o', '--output', dest='output', default='tink.bin',\
+            help='Binary output file (default TINK.BIN)')
+    parser.add_argument('--origin', type=lambda s: int(s, 0),\
+            help='Address of the first module (default its own origin)')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False,\
+            help='Print the modules and symbols')
+    args = parser.parse_args()
+
+    objects = [load_object(f) for f in args.objects]
+
+    if None in objects:
+        print('FATAL: Bad object file, aborting.')
+        sys.exit(1)
+
+    code, symbols, modules, ok = link(objects, args.origin)
+
+    if not ok:
+        print('FATAL: Linking failed, aborting.')
+        sys.exit(1)
+
+    with open(args.output, 'wb') as f:
+        f.write(code)
+
+    if args.verbose:
+
+        for name, address in modules:
+            print(f'- Module "{name}" at {address:06x}')
+
+        for name in sorted(symbols):
+            print(f'- {name} : {symbols[name]:06x}')
+
+    print(f'Linked {len(modules)} module(s) to {len(code)} bytes in {args.output}')